@@ -0,0 +1,104 @@
+from board import Board
+from movegen import legalMasks
+from packed import HAND
+import numpy as np
+
+# The standard board involves no randomness; only its topology is used
+_board = Board()
+VERTICES = tuple(_board.vertexList)
+EDGES = tuple(_board.edgeList)
+RATIOS = (2, 3, 4)
+TRADES = tuple((give, take, ratio) for give in HAND for take in HAND
+               if take != give for ratio in RATIOS)
+
+# action ids: end the turn, a settlement or a city per vertex and a road
+# per edge (Board.vertexList / edgeList order), buy a dev card, and a bank
+# trade per (give, take, ratio)
+END_TURN = 0
+SETTLEMENT = 1
+CITY = SETTLEMENT + len(VERTICES)
+ROAD = CITY + len(VERTICES)
+DEV_CARD = ROAD + len(EDGES)
+TRADE = DEV_CARD + 1
+N_ACTIONS = TRADE + len(TRADES)
+
+ACTIONS = ((('end_turn', None),) +
+           tuple(('settlement', vertex) for vertex in VERTICES) +
+           tuple(('city', vertex) for vertex in VERTICES) +
+           tuple(('road', edge) for edge in EDGES) +
+           (('dev_card', None),) +
+           tuple(('trade', trade) for trade in TRADES))
+INDEX = {action: n for n, action in enumerate(ACTIONS)}
+
+# processActions letters
+KINDS = {'E': 'end_turn', 'S': 'settlement', 'C': 'city', 'R': 'road',
+         'T': 'trade'}
+
+# bits of every trade giving a resource at a ratio
+TRADE_BITS = {}
+for n, (give, take, ratio) in enumerate(TRADES):
+    TRADE_BITS[give, ratio] = TRADE_BITS.get((give, ratio), 0) | \
+        1 << (TRADE + n)
+
+
+def encode(action):
+    """
+    Action id of a Robot style ('settlement', (i, q)) tuple or of a
+    processActions ['S', (i, q)] entry.
+    """
+    kind, spec = action
+    if kind in KINDS:
+        kind = KINDS[kind]
+        if kind == 'end_turn':
+            spec = None
+        elif kind == 'trade':
+            spec = tuple(spec[:3])  # (give, take, ratio, 1)
+    if kind in ('settlement', 'city'):
+        spec = tuple(spec)
+    return INDEX[kind, spec]
+
+
+def decode(n):
+    """The ('kind', spec) tuple of action id n."""
+    return ACTIONS[n]
+
+
+def legalBits(game):
+    """
+    Legal actions of the current player as an int with bit n set for
+    action id n. Trades are offered at the player's best rate only, as in
+    processActions, and only once the set up rounds are over.
+    """
+    settlements, cities, roads, dev_card = legalMasks(game)
+    bits = settlements << SETTLEMENT | cities << CITY | roads << ROAD | \
+        dev_card << DEV_CARD
+
+    # the turn ends once the free set up pieces are placed
+    if game.round >= 2 or not (settlements or roads):
+        bits |= 1 << END_TURN
+
+    if game.round >= 2:
+        player = game.current_player
+        for give in HAND:
+            ratio = game.tradeRatio(player, give)
+            if player.hand[give] >= ratio:
+                bits |= TRADE_BITS[give, ratio]
+
+    return bits
+
+
+def bitsToMask(bits, out=None):
+    """(len(bits), N_ACTIONS) bool array of legalBits results."""
+    size = (N_ACTIONS + 7) // 8
+    data = b''.join(n.to_bytes(size, 'little') for n in bits)
+    rows = np.frombuffer(data, np.uint8).reshape(len(bits), size)
+    mask = np.unpackbits(rows, axis=1, bitorder='little')[:, :N_ACTIONS]
+    if out is None:
+        return mask.astype(bool)
+    out[...] = mask
+    return out
+
+
+def legalMask(game):
+    """(N_ACTIONS,) bool array of the current player's legal actions."""
+    return bitsToMask([legalBits(game)])[0]
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from packed import HAND
+import hashlib
+import json
+import os
+
+# analyses kept in memory, least recently used evicted first
+CACHE_SIZE = 64
+# directory analyses are persisted to, if set
+CACHE_DIR = os.environ.get('BOARD_ANALYSIS_DIR')
+
+RESOURCE = {resource: r for r, resource in enumerate(HAND)}
+
+
+def pips(roll):
+    """Ways out of 36 that two dice make roll."""
+    return 6 - abs(7 - roll)
+
+
+def layoutKey(board):
+    """
+    Canonical hash of board's layout: the resource and roll of every
+    tile and the port of every vertex. Boards with the same key produce
+    the same analysis.
+    """
+    layout = [[board.spots[spot].resource, board.rollDic.get(spot, 0)]
+              for spot in range(1, 20)]
+    ports = [board.vertices[i][q].port for i, q in board.vertexList]
+    data = json.dumps([layout, ports], separators=(',', ':'))
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class BoardAnalysis:
+    """
+    Facts derived from a board's layout, computed once per layout.
+
+    Vertices and tiles are numbered as in Board.vertexList and
+    Board.spots. Per vertex:
+
+    yields       (spot, resource, pips) of each producing tile, resources
+                 numbered in packed.HAND order
+    production   pips per resource
+    ports        the port, or None
+
+    and tileVertices (vertex numbers per spot) and rollTiles (producing
+    spots per roll).
+    """
+
+    FIELDS = ('key', 'yields', 'production', 'ports', 'tileVertices',
+              'rollTiles')
+
+    # set by opening.solverFor; not persisted
+    openingSolver = None
+
+    @classmethod
+    def fromBoard(cls, board, key=None):
+        analysis = cls()
+        analysis.key = key or layoutKey(board)
+        vertexIndex = board.vertexIndex
+
+        analysis.yields = []
+        analysis.production = []
+        for vertex in board.vertexList:
+            yields = []
+            production = [0] * len(HAND)
+            for spot in board.vertexTiles[vertex]:
+                if spot in board.rollDic:
+                    r = RESOURCE[board.spots[spot].resource.lower()]
+                    n = pips(board.rollDic[spot])
+                    yields.append((spot, r, n))
+                    production[r] += n
+            analysis.yields.append(tuple(yields))
+            analysis.production.append(tuple(production))
+        analysis.ports = [board.vertices[i][q].port
+                          for i, q in board.vertexList]
+
+        analysis.tileVertices = {
+            spot: tuple(vertexIndex[tuple(v)] for v in tile.vertices)
+            for spot, tile in board.spots.items()}
+        analysis.rollTiles = {roll: () for roll in range(2, 13)}
+        for spot, roll in sorted(board.rollDic.items()):
+            analysis.rollTiles[roll] += (spot,)
+        return analysis
+
+    def toDict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def fromDict(cls, data):
+        """Rebuild an analysis from toDict output read back from JSON."""
+        analysis = cls()
+        analysis.key = data['key']
+        analysis.yields = [tuple(map(tuple, yields))
+                           for yields in data['yields']]
+        analysis.production = [tuple(p) for p in data['production']]
+        analysis.ports = data['ports']
+        # JSON object keys are strings
+        analysis.tileVertices = {int(spot): tuple(vertices) for spot, vertices
+                                 in data['tileVertices'].items()}
+        analysis.rollTiles = {int(roll): tuple(spots)
+                              for roll, spots in data['rollTiles'].items()}
+        return analysis
+
+
+class AnalysisCache:
+    """
+    In-process LRU of BoardAnalysis by layout key, backed by
+    <directory>/<key>.json when a directory is given so processes sharing
+    a board set compute each analysis once between them.
+    """
+
+    def __init__(self, size=CACHE_SIZE, directory=CACHE_DIR):
+        self.size = size
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, board):
+        key = layoutKey(board)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        analysis = self.load(key)
+        if analysis is None:
+            analysis = BoardAnalysis.fromBoard(board, key)
+            self.save(analysis)
+
+        self.entries[key] = analysis
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return analysis
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def load(self, key):
+        if not self.directory or not os.path.exists(self.path(key)):
+            return None
+        with open(self.path(key)) as f:
+            return BoardAnalysis.fromDict(json.load(f))
+
+    def save(self, analysis):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(analysis.key)
+        # written whole then renamed, so readers never see a partial file
+        with open('%s.%d.tmp' % (path, os.getpid()), 'w') as f:
+            json.dump(analysis.toDict(), f)
+        os.replace('%s.%d.tmp' % (path, os.getpid()), path)
+
+    def clear(self):
+        self.entries.clear()
+
+
+cache = AnalysisCache()
+
+
+def analyze(board):
+    """The BoardAnalysis of board's layout, from the shared cache."""
+    return cache.get(board)
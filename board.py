@@ -11,6 +11,11 @@ class Board:
         self.edges = {}
         self.setEdges()
         self.availableEdges = set(self.edges.keys())
+        self.setAdjacency()
+
+        #bitmask mirrors of availableVertices and availableEdges
+        self.availableVertexMask = (1 << len(self.vertexList)) - 1
+        self.availableEdgeMask = (1 << len(self.edgeList)) - 1
 
 
 
@@ -125,13 +130,80 @@ class Board:
             if q % 2 == 0:
                 self.edges[((4,q),(5,q))] = Edge()
 
+    def setAdjacency(self):
+        #read-only lookup tables keyed by (i,q) vertex tuples and edge
+        #tuples, built once so purchases don't have to scan the whole board
+        vertexEdges = {}
+        vertexNeighbors = {}
+        vertexTiles = {}
+        for i in range(6):
+            for q in range(11):
+                if self.vertices[i][q]:
+                    vertexEdges[(i,q)] = []
+                    vertexNeighbors[(i,q)] = []
+                    vertexTiles[(i,q)] = []
+
+        for edge in self.edges:
+            v1, v2 = edge
+            vertexEdges[v1].append(edge)
+            vertexEdges[v2].append(edge)
+            vertexNeighbors[v1].append(v2)
+            vertexNeighbors[v2].append(v1)
+
+        for spot in range(1,20):
+            for vertex in self.spots[spot].vertices:
+                vertexTiles[tuple(vertex)].append(spot)
+
+        edgeEdges = {}
+        for edge in self.edges:
+            edgeEdges[edge] = tuple(e for v in edge for e in vertexEdges[v]
+                                    if e != edge)
+
+        #fixed numbering of the 54 vertices and 72 edges for array and
+        #bitmask representations of the board
+        self.vertexList = tuple(vertexEdges)
+        self.vertexIndex = {v: n for n, v in enumerate(self.vertexList)}
+        self.edgeList = tuple(self.edges)
+        self.edgeIndex = {e: n for n, e in enumerate(self.edgeList)}
+
+        self.vertexEdges = {v: tuple(el) for v, el in vertexEdges.items()}
+        self.vertexNeighbors = {v: tuple(el)
+                                for v, el in vertexNeighbors.items()}
+        self.vertexTiles = {v: tuple(el) for v, el in vertexTiles.items()}
+        self.edgeEdges = edgeEdges
+
+        #the same adjacency as bitmasks, indexed by vertex/edge number
+        self.vertexEdgeMasks = tuple(
+            sum(1 << self.edgeIndex[e] for e in self.vertexEdges[v])
+            for v in self.vertexList)
+        self.vertexNeighborMasks = tuple(
+            sum(1 << self.vertexIndex[n] for n in self.vertexNeighbors[v])
+            for v in self.vertexList)
+        self.edgeVertexMasks = tuple(
+            1 << self.vertexIndex[e[0]] | 1 << self.vertexIndex[e[1]]
+            for e in self.edgeList)
+
+    def clone(self, players={}):
+        """
+        Copy ownership and availability, sharing the static layout and
+        adjacency tables. players maps old owners to their replacements.
+        """
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.spots = {spot: tile.clone() for spot, tile in self.spots.items()}
+        board.vertices = [[vertex.clone(players) if vertex else None
+                           for vertex in row] for row in self.vertices]
+        board.availableVertices = [row[:] for row in self.availableVertices]
+        board.edges = {key: edge.clone(players)
+                       for key, edge in self.edges.items()}
+        board.availableEdges = set(self.availableEdges)
+        return board
+
     def propogateVertexPurchase(self, t):
-        for el in self.edges:
-            if t in el:
-                if t == el[0]:
-                    self.availableVertices[el[1][0]][el[1][1]] = False
-                else:
-                    self.availableVertices[el[0][0]][el[0][1]] = False
+        for neighbor in self.vertexNeighbors[t]:
+            self.availableVertices[neighbor[0]][neighbor[1]] = False
+        self.availableVertexMask &= ~self.vertexNeighborMasks[
+            self.vertexIndex[t]]
 
 
 class Vertex:
@@ -142,6 +214,14 @@ class Vertex:
         self.city = None
         self.val = 0
 
+    def clone(self, players={}):
+        vertex = Vertex.__new__(Vertex)
+        vertex.owner = players.get(self.owner, self.owner)
+        vertex.port = self.port
+        vertex.city = self.city
+        vertex.val = self.val
+        return vertex
+
 class Tile:
 
     def __init__(self):
@@ -149,7 +229,20 @@ class Tile:
         self.vertices = []
         self.blocked = False
 
+    def clone(self):
+        tile = Tile.__new__(Tile)
+        tile.resource = self.resource
+        tile.vertices = self.vertices
+        tile.blocked = self.blocked
+        return tile
+
 class Edge:
 
     def __init__(self):
         self.owner = None
+
+    def clone(self, players={}):
+        edge = Edge.__new__(Edge)
+        edge.owner = players.get(self.owner, self.owner)
+        return edge
+
@@ -0,0 +1,154 @@
+import numpy as np
+import json
+import os
+
+# state planes are stored as bytes, counts above this are clipped
+MAX_VALUE = 255
+
+
+class DatasetWriter:
+    """
+    Streaming writer for (state, action, outcome) training records.
+
+    Records are buffered and written out shard_size at a time as .npy
+    files: uint8 states of shape (n, C, 11, 21), int32 actions and int8
+    outcomes. index.json lists the shards and their lengths and is
+    rewritten after every shard, so a directory can be read while it is
+    still being written to. Writing to an existing directory appends.
+    """
+
+    def __init__(self, directory, shard_size=1 << 16):
+        self.directory = directory
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, 'index.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {'shape': None, 'shards': []}
+
+        self.states = None
+        self.actions = np.zeros(shard_size, np.int32)
+        self.outcomes = np.zeros(shard_size, np.int8)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, state, action, outcome):
+        """Add one record. state is a (C, 11, 21) array or nested list."""
+        if self.states is None:
+            shape = np.shape(state)
+            if self.index['shape'] is None:
+                self.index['shape'] = list(shape)
+            elif list(shape) != self.index['shape']:
+                raise ValueError('state shape %s does not match dataset %s'
+                                 % (shape, self.index['shape']))
+            self.states = np.zeros((self.shard_size,) + shape, np.uint8)
+
+        np.clip(state, 0, MAX_VALUE, out=self.states[self.count],
+                casting='unsafe')
+        self.actions[self.count] = action
+        self.outcomes[self.count] = outcome
+        self.count += 1
+        if self.count == self.shard_size:
+            self.flush()
+
+    def addMany(self, states, actions, outcomes):
+        """Add records from equal length sequences."""
+        for state, action, outcome in zip(states, actions, outcomes):
+            self.add(state, action, outcome)
+
+    def flush(self):
+        """Write the buffered records as a new shard."""
+        if not self.count:
+            return
+
+        name = 'shard-%05d' % len(self.index['shards'])
+        for field, data in (('states', self.states),
+                            ('actions', self.actions),
+                            ('outcomes', self.outcomes)):
+            np.save(os.path.join(self.directory, '%s.%s.npy' % (name, field)),
+                    data[:self.count])
+
+        self.index['shards'].append({'name': name, 'length': self.count})
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.index, f)
+        os.replace(path + '.tmp', path)
+        self.count = 0
+
+    def close(self):
+        self.flush()
+
+
+class Dataset:
+    """
+    Reader for a directory written by DatasetWriter.
+
+    Shards are memory mapped, so indexing and minibatches only read the
+    rows they use.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json')) as f:
+            self.index = json.load(f)
+
+        lengths = [shard['length'] for shard in self.index['shards']]
+        self.offsets = np.cumsum([0] + lengths)
+        self.shards = [None] * len(lengths)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def shard(self, n):
+        """States, actions and outcomes of shard n, memory mapped."""
+        if self.shards[n] is None:
+            name = self.index['shards'][n]['name']
+            self.shards[n] = tuple(
+                np.load(os.path.join(self.directory,
+                                     '%s.%s.npy' % (name, field)),
+                        mmap_mode='r')
+                for field in ('states', 'actions', 'outcomes'))
+        return self.shards[n]
+
+    def __getitem__(self, i):
+        n = int(np.searchsorted(self.offsets, i, side='right')) - 1
+        states, actions, outcomes = self.shard(n)
+        i -= self.offsets[n]
+        return states[i], int(actions[i]), int(outcomes[i])
+
+    def gather(self, indices):
+        """Records at the given global indices, as three arrays."""
+        indices = np.asarray(indices)
+        shards = np.searchsorted(self.offsets, indices, side='right') - 1
+        states = np.empty((len(indices),) + tuple(self.index['shape']),
+                          np.uint8)
+        actions = np.empty(len(indices), np.int32)
+        outcomes = np.empty(len(indices), np.int8)
+
+        for n in np.unique(shards):
+            rows = np.nonzero(shards == n)[0]
+            local = indices[rows] - self.offsets[n]
+            order = np.argsort(local)  # read each shard front to back
+            rows, local = rows[order], local[order]
+            shard_states, shard_actions, shard_outcomes = self.shard(n)
+            states[rows] = shard_states[local]
+            actions[rows] = shard_actions[local]
+            outcomes[rows] = shard_outcomes[local]
+
+        return states, actions, outcomes
+
+    def batches(self, batch_size, shuffle=True, seed=None):
+        """Yield (states, actions, outcomes) minibatches over one epoch."""
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            yield self.gather(order[start:start + batch_size])
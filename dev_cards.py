@@ -4,6 +4,25 @@ class DevelopmentCards:
 
     def __init__(self):
 
-        self.cards = ['Knight']*14 + ['Year of Plenty']*2 + ['Monoploy']*2 + ['Road Builder']*2 + ['Point Card']*5
+        cards = ['Knight']*14 + ['Year of Plenty']*2 + ['Monoploy']*2 + ['Road Builder']*2 + ['Point Card']*5
 
-        random.shuffle(self.cards)
+        random.shuffle(cards)
+
+        #the shuffled deck never changes, only how far into it we are,
+        #so clones can share it
+        self.cards = tuple(cards)
+        self.drawn = 0
+
+    def __len__(self):
+        return len(self.cards) - self.drawn
+
+    def draw(self):
+        card = self.cards[self.drawn]
+        self.drawn += 1
+        return card
+
+    def clone(self):
+        deck = DevelopmentCards.__new__(DevelopmentCards)
+        deck.cards = self.cards
+        deck.drawn = self.drawn
+        return deck
@@ -0,0 +1,142 @@
+import numpy as np
+
+# own pieces, opposing pieces, 5 hand counts, cities, played knights and
+# point cards
+PLANES = 10
+SHAPE = (PLANES, 11, 21)
+
+# (row, col) of every vertex and edge in Board.vertexList / edgeList
+# order, filled from the first board encoded (the topology never changes)
+_cells = None
+
+
+def cells(board):
+    global _cells
+    if _cells is None:
+        vrow = np.array([2 * i for i, q in board.vertexList])
+        vcol = np.array([2 * q for i, q in board.vertexList])
+        # sideways roads sit between their vertices on the same row,
+        # downward roads on the odd row below
+        erow = np.array([2 * a[0] + (b[0] - a[0]) for a, b in board.edgeList])
+        ecol = np.array([2 * a[1] + (b[1] - a[1]) for a, b in board.edgeList])
+        _cells = (vrow, vcol, erow, ecol)
+    return _cells
+
+
+def maskBits(masks, n):
+    """(len(masks), n) uint8 array of the low n bits of each int mask."""
+    data = b''.join(mask.to_bytes(9, 'little') for mask in masks)
+    rows = np.frombuffer(data, np.uint8).reshape(len(masks), 9)
+    return np.unpackbits(rows, axis=1, bitorder='little')[:, :n]
+
+
+def orMasks(masks):
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+
+def encodeBatch(games, out=None):
+    """
+    Encode games from their current players' point of view into a
+    (B, PLANES, 11, 21) uint8 array, out if given.
+
+    The layout handler.getState has always used: planes 0 and 1 hold the
+    current player's and the opponents' pieces on the 11x21 grid (1 for a
+    road or settlement, 2 for an own city), the rest are constant planes
+    of hand counts, cities, played knights and point cards.
+    """
+    if out is None:
+        out = np.zeros((len(games),) + SHAPE, np.uint8)
+    else:
+        out[...] = 0
+    if not games:
+        return out
+
+    vrow, vcol, erow, ecol = cells(games[0].board)
+    vertexMasks = []
+    edgeMasks = []
+    counts = []
+    for game in games:
+        player = game.current_player
+        others = [p for p in game.players if p is not player]
+        vertexMasks += [player.settlementMask, player.cityMask,
+                        orMasks(p.settlementMask for p in others)]
+        edgeMasks += [player.roadMask, orMasks(p.roadMask for p in others)]
+        counts.append(list(player.hand.values()) +
+                      [len(player.cities), player.played_knights,
+                       player.point_cards])
+
+    vertices = maskBits(vertexMasks, 54).reshape(len(games), 3, 54)
+    edges = maskBits(edgeMasks, 72).reshape(len(games), 2, 72)
+
+    # an upgraded vertex stays in settlementMask, so cities add up to 2
+    out[:, 0, vrow, vcol] = vertices[:, 0] + vertices[:, 1]
+    out[:, 1, vrow, vcol] = vertices[:, 2]
+    out[:, 0, erow, ecol] = edges[:, 0]
+    out[:, 1, erow, ecol] = edges[:, 1]
+    out[:, 2:] = np.clip(counts, 0, 255)[:, :, None, None]
+    return out
+
+
+def encode(game, out=None):
+    """Encode one game into a (PLANES, 11, 21) uint8 array, out if given."""
+    if out is None:
+        out = np.zeros(SHAPE, np.uint8)
+    encodeBatch([game], out[None])
+    return out
+
+
+class CandidateBatch:
+    """
+    Successor states of one encoded state, kept as the shared base plus
+    a sparse delta per candidate: single cells (plane, row, col, value)
+    and whole constant planes (plane, value).
+
+    Indexing builds one candidate; materialize builds all of them into
+    one contiguous (N, PLANES, 11, 21) array.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.count = 0
+        self.cellDeltas = []  # (candidate, plane, row, col, value)
+        self.planeDeltas = []  # (candidate, plane, value)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, cells=(), planes=()):
+        """Add a candidate that differs from base by cells and planes."""
+        k = self.count
+        self.cellDeltas += [(k,) + cell for cell in cells]
+        self.planeDeltas += [(k,) + plane for plane in planes]
+        self.count += 1
+        return k
+
+    def __getitem__(self, k):
+        if not -self.count <= k < self.count:
+            raise IndexError('candidate index out of range')
+        k %= self.count
+        state = self.base.copy()
+        for c, plane, row, col, value in self.cellDeltas:
+            if c == k:
+                state[plane, row, col] = value
+        for c, plane, value in self.planeDeltas:
+            if c == k:
+                state[plane] = value
+        return state
+
+    def materialize(self, out=None):
+        """All candidates as one (N, PLANES, 11, 21) array, out if given."""
+        if out is None:
+            out = np.empty((self.count,) + self.base.shape, self.base.dtype)
+        out[...] = self.base
+        if self.cellDeltas:
+            k, plane, row, col, value = np.array(self.cellDeltas).T
+            out[k, plane, row, col] = value
+        if self.planeDeltas:
+            k, plane, value = np.array(self.planeDeltas).T
+            out[k, plane] = np.clip(value, 0, 255)[:, None, None]
+        return out
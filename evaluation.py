@@ -0,0 +1,111 @@
+from packed import HAND
+from analysis import analyze, pips, RESOURCE
+import numpy as np
+
+FEATURES = ('points', 'production', 'diversity', 'ports', 'road', 'army',
+            'dev_cards', 'cards')
+WEIGHTS = np.array([1.0, 2.0, 0.15, 0.2, 1.0, 1.0, 0.3, 0.05])
+
+class Evaluator:
+    """
+    Position evaluation for Robot, kept current move by move.
+
+    The expensive part, each player's expected production in pips per
+    resource, is updated from apply_action records through update and
+    revert. Everything else is read off the players when features is
+    called: points, ports, dev cards, hand size and the distance to the
+    longest road and largest army.
+    """
+
+    def __init__(self, game):
+        self.seats = {player.name: seat
+                      for seat, player in enumerate(game.players)}
+        self.analysis = analyze(game.board)
+        self.refresh(game)
+
+    def refresh(self, game):
+        """Recompute production from game.production."""
+        self.production = [[0] * len(HAND) for player in game.players]
+        for roll, entries in game.production.items():
+            for owner, resource, val in entries.values():
+                self.production[self.seats[owner.name]][RESOURCE[resource]] \
+                    += pips(roll) * val
+
+    def clone(self):
+        evaluator = Evaluator.__new__(Evaluator)
+        evaluator.seats = self.seats
+        evaluator.analysis = self.analysis
+        evaluator.production = [list(row) for row in self.production]
+        return evaluator
+
+    def vertexPips(self, game, vertex):
+        """(resource, pips) a building level at vertex produces."""
+        spots = game.board.spots
+        for spot, r, n in self.analysis.yields[game.board.vertexIndex[vertex]]:
+            if not spots[spot].blocked:
+                yield r, n
+
+    def update(self, game, record, sign=1):
+        """Fold in the production change of an apply_action record."""
+        action, player = record[0], record[1]
+        if action[0] in ('settlement', 'city'):
+            row = self.production[self.seats[player.name]]
+            for r, n in self.vertexPips(game, tuple(action[1])):
+                row[r] += sign * n
+
+    def revert(self, game, record):
+        """Take back update for record, after undo_action."""
+        self.update(game, record, -1)
+
+    def features(self, game):
+        """(players, FEATURES) array, rows in game.players order."""
+        players = game.players
+        lengths = [game.longestRoad.length(player) for player in players]
+        knights = [player.played_knights for player in players]
+        rows = []
+        for seat, player in enumerate(players):
+            production = self.production[seat]
+
+            # cards or roads still needed to take the title
+            if player.longest_road:
+                road = 0
+            else:
+                best = max(lengths[:seat] + lengths[seat + 1:])
+                road = 1 / (1 + max(5, best + 1) - lengths[seat])
+            if player.largest_army:
+                army = 0
+            else:
+                best = max(knights[:seat] + knights[seat + 1:])
+                army = 1 / (1 + max(3, best + 1) - knights[seat])
+
+            rows.append((
+                player.points,
+                sum(production) / 36,
+                sum(1 for n in production if n),
+                sum(1 for port in player.ports.values() if port),
+                road,
+                army,
+                player.knight + player.year_of_plenty + player.monopoly +
+                player.road_builder,
+                sum(player.hand.values())))
+        return np.array(rows, np.float64)
+
+    def value(self, game, name):
+        """Score of the named player minus the best opponent's."""
+        return float(evaluateBatch(self.features(game)[None],
+                                   [self.seats[name]])[0])
+
+
+def evaluateBatch(features, seats):
+    """
+    Values of many positions at once: features is (N, players, FEATURES)
+    as stacked from Evaluator.features, seats the (N,) player each value
+    is for. Returns that player's weighted score minus the best
+    opponent's.
+    """
+    scores = np.asarray(features) @ WEIGHTS
+    n = np.arange(len(scores))
+    seats = np.asarray(seats)
+    own = scores[n, seats]
+    scores[n, seats] = -np.inf
+    return own - scores.max(axis=1)
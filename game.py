@@ -2,8 +2,13 @@ from robot import Robot
 from player import Player
 from board import Board
 from dev_cards import DevelopmentCards
+from longest_road import LongestRoad
+from robber import bestRobberMove
 import random
 
+# points that win the game
+WIN_POINTS = 10
+
 
 class Game:
     def __init__(self, player_names=['Adam', 'bot', 'Julia'],
@@ -21,6 +26,14 @@ class Game:
         self.board = Board()
         self.devcards = DevelopmentCards()
 
+        # dice value -> {(spot, vertex): (player, resource, multiplier)}
+        # kept in sync by buySettlement, buyCity and moveRobber so a roll
+        # only touches the settlements that actually produce on it
+        self.production = {roll: {} for roll in range(2, 13)}
+        self.robber = next(spot for spot, tile in self.board.spots.items()
+                           if tile.resource == 'Desert')
+        self.longestRoad = LongestRoad(self.board)
+
         self.order = player_names
         random.shuffle(self.order)
 
@@ -35,15 +48,53 @@ class Game:
 
         self.dieRoll = ''
         self.rolled = False
+        self.robberPending = False  # a 7 was rolled, the robber must move
         self.playedDev = False
         self.building_roads = 0
         self.longest_holder = ''
         self.largest_holder = ''
 
+        # Zobrist key, kept current by apply_action/undo_action once a
+        # search sets zobrist (see zobrist.py)
+        self.zobrist = None
+        self.hashKey = 0
+        # incremental evaluation.Evaluator, also kept current once set
+        self.evaluator = None
+
     def clone(self):
-        """Create a deep copy of the game state."""
-        import copy
-        return copy.deepcopy(self)
+        """
+        Copy the mutable game state. The board topology, tile layout and
+        dev card deck order are shared with the original.
+        """
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+
+        players = {player: player.clone() for player in self.players}
+        game.players = [players[player] for player in self.players]
+        game.player_dic = {name: players[player]
+                           for name, player in self.player_dic.items()}
+        game.current_player = players[self.current_player]
+        game.longest_holder = players.get(self.longest_holder,
+                                          self.longest_holder)
+        game.largest_holder = players.get(self.largest_holder,
+                                          self.largest_holder)
+
+        game.board = self.board.clone(players)
+        game.devcards = self.devcards.clone()
+        game.longestRoad = self.longestRoad.clone(game.board, players)
+        if self.evaluator:
+            game.evaluator = self.evaluator.clone()
+        game.production = {
+            roll: {key: (players[owner], resource, val)
+                   for key, (owner, resource, val) in entries.items()}
+            for roll, entries in self.production.items()}
+
+        # during setup the settlement grid is the board's own
+        game.moves = dict(self.moves)
+        if self.moves.get('settlements') is self.board.availableVertices:
+            game.moves['settlements'] = game.board.availableVertices
+
+        return game
 
     def is_action_valid(self, player, action):
         """Check if the action is valid in the current game state."""
@@ -55,22 +106,32 @@ class Game:
             return self.is_city_valid(player, action[1])
         elif action[0] == 'dev_card':
             return self.is_dev_card_valid(player)
+        elif action[0] == 'trade':
+            return self.is_trade_valid(player, action[1])
+        elif action[0] == 'end_turn':
+            return len(action) < 2 or action[1] is None or \
+                2 <= action[1] <= 12
+        elif action[0] == 'robber':
+            return self.is_robber_valid(player, action[1])
         return False
 
     def is_settlement_valid(self, player, coordinates):
         """Check if a settlement can be placed at the given coordinates."""
-        # Example logic: Check resources and if the spot is available
+        # Setup settlements are free
         return (
-            coordinates in self.board.availableVertices and
-            player.hand['wheat'] > 0 and
-            player.hand['sheep'] > 0 and
-            player.hand['brick'] > 0 and
-            player.hand['wood'] > 0
+            bool(self.board.availableVertices[coordinates[0]][coordinates[1]]) and
+            (self.round < 2 or
+             player.hand['wheat'] > 0 and
+             player.hand['sheep'] > 0 and
+             player.hand['brick'] > 0 and
+             player.hand['wood'] > 0)
         )
 
     def is_road_valid(self, player, road):
         """Check if a road can be placed at the given coordinates."""
-        return road in self.board.availableEdges and player.hand['wood'] > 0 and player.hand['brick'] > 0
+        return road in self.board.availableEdges and \
+            (self.round < 2 or self.building_roads > 0 or
+             player.hand['wood'] > 0 and player.hand['brick'] > 0)
 
     def is_city_valid(self, player, coordinates):
         """Check if a city can be upgraded at the given coordinates."""
@@ -79,22 +140,146 @@ class Game:
 
     def is_dev_card_valid(self, player):
         """Check if a development card can be bought."""
-        return len(self.devcards.cards) > 0 and player.hand['wheat'] > 0 and player.hand['ore'] > 0 and player.hand['sheep'] > 0
+        return len(self.devcards) > 0 and player.hand['wheat'] > 0 and player.hand['ore'] > 0 and player.hand['sheep'] > 0
+
+    def is_trade_valid(self, player, trade):
+        """Check if a (give, take, ratio) bank trade is possible."""
+        give, take, ratio = trade
+        return give != take and ratio >= self.tradeRatio(player, give) and \
+            player.hand[give] >= ratio
+
+    def tradeRatio(self, player, resource):
+        """Best bank rate the player's ports allow for resource."""
+        if player.ports[resource]:
+            return 2
+        elif player.ports['3:1']:
+            return 3
+        return 4
 
     def apply_action(self, player, action):
-        """Apply an action to the game state if valid."""
+        """
+        Apply an action to the game state if valid.
+
+        Returns an undo record that undo_action uses to restore the state
+        from before the action, or None if the action was rejected. An
+        end_turn that rolls a 7 also plays it out with resolveSeven.
+        """
         if not self.is_action_valid(player, action):
             print(f"Invalid action attempted: {action}")
-            return
+            return None
+
+        # state every action can touch: turn bookkeeping, all hands (dice
+        # rolls pay everyone), scores and the longest road holder
+        scalars = (self.turn, self.round, self.current_player, self.dieRoll,
+                   self.rolled, self.playedDev, self.building_roads,
+                   self.lastHouse, self.moves, self.longest_holder,
+                   self.hashKey, self.robberPending)
+        hands = tuple(tuple(p.hand.values()) for p in self.players)
+        scores = tuple((p.points, p.longest_road) for p in self.players)
+        extra = None
 
         if action[0] == 'settlement':
+            i, q = action[1]
+            neighbors = self.board.vertexNeighbors[(i, q)]
+            available = tuple(self.board.availableVertices[v[0]][v[1]]
+                              for v in ((i, q),) + neighbors)
+            port = self.board.vertices[i][q].port
+            gotPort = bool(port) and not player.ports[port]
+            mask = self.board.availableVertexMask
             self.buySettlement(player.name, action[1])
+            extra = (available, port, gotPort, self.longestRoad.last, mask)
         elif action[0] == 'road':
+            reach = player.reachMask
             self.buyRoad(player.name, action[1])
+            extra = (self.longestRoad.last, reach)
         elif action[0] == 'city':
             self.buyCity(player.name, action[1])
         elif action[0] == 'dev_card':
+            extra = (player.knight, player.year_of_plenty,
+                     player.monopoly, player.road_builder,
+                     player.point_cards)
             self.buyDev()
+        elif action[0] == 'trade':
+            give, take, ratio = action[1]
+            player.hand[give] -= ratio
+            player.hand[take] += 1
+        elif action[0] == 'end_turn':
+            robber = (self.robber, self.board.spots[self.robber].blocked)
+            self.endTurn(action[1] if len(action) > 1 else None)
+            if self.robberPending:
+                # searches play a rolled 7 out like the headless games do
+                extra = robber
+                self.resolveSeven()
+        elif action[0] == 'robber':
+            extra = (self.robber, self.board.spots[self.robber].blocked)
+            self.placeRobber(player, *action[1])
+
+        record = (action, player, scalars, hands, scores, extra)
+        if self.zobrist:
+            self.hashKey = self.zobrist.update(self, record, self.hashKey)
+        if self.evaluator:
+            self.evaluator.update(self, record)
+        return record
+
+    def undo_action(self, record):
+        """Revert the action that produced record, most recent first."""
+        action, player, scalars, hands, scores, extra = record
+
+        if action[0] == 'settlement':
+            i, q = action[1]
+            available, port, gotPort, token, mask = extra
+            player.settlements.pop()
+            self.board.availableVertexMask = mask
+            player.settlementMask &= ~(1 << self.board.vertexIndex[(i, q)])
+            vertex = self.board.vertices[i][q]
+            vertex.owner = None
+            vertex.val = 0
+            for v, value in zip(((i, q),) + self.board.vertexNeighbors[(i, q)],
+                                available):
+                self.board.availableVertices[v[0]][v[1]] = value
+            self.updateProduction((i, q))
+            self.longestRoad.undoSettlement(token)
+            if gotPort:
+                player.ports[port] = False
+        elif action[0] == 'road':
+            player.roads.pop()
+            self.board.availableEdges.add(action[1])
+            self.board.edges[action[1]].owner = None
+            token, player.reachMask = extra
+            self.longestRoad.undoRoad(token)
+            n = self.board.edgeIndex[action[1]]
+            self.board.availableEdgeMask |= 1 << n
+            player.roadMask &= ~(1 << n)
+        elif action[0] == 'city':
+            vertex = self.board.vertices[action[1][0]][action[1][1]]
+            vertex.city = None
+            vertex.val = 1
+            self.updateProduction(tuple(action[1]))
+            player.cities.pop()
+            player.cityMask &= ~(1 << self.board.vertexIndex[tuple(action[1])])
+        elif action[0] == 'dev_card':
+            self.devcards.drawn -= 1
+            player.knight, player.year_of_plenty, player.monopoly, \
+                player.road_builder, player.point_cards = extra
+        elif action[0] in ('robber', 'end_turn') and extra:
+            spot, blocked = extra
+            self.moveRobber(spot)
+            # only the desert, which produces nothing, starts unblocked
+            self.board.spots[spot].blocked = blocked
+
+        self.turn, self.round, self.current_player, self.dieRoll, \
+            self.rolled, self.playedDev, self.building_roads, \
+            self.lastHouse, self.moves, self.longest_holder, \
+            self.hashKey, self.robberPending = scalars
+
+        for p, hand, (points, longest) in zip(self.players, hands, scores):
+            for key, n in zip(p.hand, hand):
+                p.hand[key] = n
+            p.points = points
+            p.longest_road = longest
+
+        if self.evaluator:
+            self.evaluator.revert(self, record)
 
     def playerUpdate(self):
         """Switch to the next player and handle their actions."""
@@ -113,32 +298,164 @@ class Game:
             self.availableMoves()
             self.rolled = False
 
-    def endTurn(self):
-        """End the current player's turn."""
+    def endTurn(self, roll=None):
+        """End the current player's turn, optionally forcing the next roll."""
         self.turn += 1
         self.round = self.turn // len(self.players)
         self.playerUpdate()
         if self.round > 1:
-            self.rollDice()
+            self.rollDice(roll)
 
 
-    def rollDice(self):
-        """Roll dice and distribute resources."""
+    def rollDice(self, roll=None):
+        """Roll dice and distribute resources. roll forces the total."""
         if not self.rolled:  # Ensure dice can only be rolled once per turn
-            d1 = random.randint(1, 6)
-            d2 = random.randint(1, 6)
-            self.dieRoll = d1 + d2
+            if roll is None:
+                d1 = random.randint(1, 6)
+                d2 = random.randint(1, 6)
+                roll = d1 + d2
+            self.dieRoll = roll
             self.rolled = True  # Mark dice as rolled
+            self.robberPending = roll == 7
 
             # Distribute resources
-            for spot in self.board.rollDic.keys():
-                if self.board.rollDic[spot] == self.dieRoll and not self.board.spots[spot].blocked:
-                    for vertex in self.board.spots[spot].vertices:
-                        if self.board.vertices[vertex[0]][vertex[1]].owner:
-                            owner = self.board.vertices[vertex[0]][vertex[1]].owner
-                            owner.hand[self.board.spots[spot].resource.lower()] += self.board.vertices[vertex[0]][vertex[1]].val
-
-          
+            for owner, resource, val in self.production[self.dieRoll].values():
+                owner.hand[resource] += val
+
+    def rollOutcomes(self):
+        """
+        Distinct results of the next roll as (roll, probability) pairs.
+
+        Rolls that pay out exactly the same resources are merged into one
+        entry, most likely first. A 7 is always its own entry, since it
+        moves the robber.
+        """
+        outcomes = {}
+        for roll in range(2, 13):
+            payout = {}
+            for owner, resource, val in self.production[roll].values():
+                payout[owner.name, resource] = \
+                    payout.get((owner.name, resource), 0) + val
+
+            key = 7 if roll == 7 else frozenset(payout.items())
+            outcome = outcomes.setdefault(key, [roll, 0])
+            outcome[1] += (6 - abs(7 - roll)) / 36
+
+        return sorted(map(tuple, outcomes.values()), key=lambda o: -o[1])
+
+    def updateProduction(self, vertex):
+        """Refresh the production table entries of a single vertex."""
+        vert = self.board.vertices[vertex[0]][vertex[1]]
+        for spot in self.board.vertexTiles[vertex]:
+            if spot not in self.board.rollDic:
+                continue
+
+            tile = self.board.spots[spot]
+            entries = self.production[self.board.rollDic[spot]]
+            if vert.owner and not tile.blocked:
+                entries[(spot, vertex)] = (vert.owner, tile.resource.lower(),
+                                           vert.val)
+            else:
+                entries.pop((spot, vertex), None)
+
+    def moveRobber(self, spot):
+        """Move the robber to the given tile and block its production."""
+        self.board.spots[self.robber].blocked = False
+        for vertex in self.board.spots[self.robber].vertices:
+            self.updateProduction(tuple(vertex))
+
+        self.robber = spot
+        self.board.spots[spot].blocked = True
+        for vertex in self.board.spots[spot].vertices:
+            self.updateProduction(tuple(vertex))
+        if self.evaluator:
+            self.evaluator.refresh(self)
+
+    def robberVictims(self, spot, player=None):
+        """
+        Opponents of player (the current player by default) with a
+        building on spot and at least one card to steal.
+        """
+        player = player or self.current_player
+        victims = []
+        for i, q in self.board.spots[spot].vertices:
+            owner = self.board.vertices[i][q].owner
+            if owner and owner is not player and owner not in victims and \
+                    sum(owner.hand.values()):
+                victims.append(owner)
+        return victims
+
+    def drawCard(self, player, rng=random):
+        """
+        Remove one of player's cards, drawn at random, and return its
+        resource, or None if player has no cards.
+        """
+        cards = sum(player.hand.values())
+        if not cards:
+            return None
+
+        k = rng.randrange(cards)
+        for resource, n in player.hand.items():
+            if k < n:
+                break
+            k -= n
+        player.hand[resource] -= 1
+        return resource
+
+    def steal(self, player, victim, rng=random):
+        """
+        Move one of victim's cards, drawn at random, to player. Returns
+        the resource taken, or None if victim has no cards.
+        """
+        resource = self.drawCard(victim, rng)
+        if resource is not None:
+            player.hand[resource] += 1
+        return resource
+
+    def discardHalf(self, rng=random):
+        """
+        The discard on a 7: every player holding more than 7 cards loses
+        half of them, rounded down, drawn at random.
+        """
+        for player in self.players:
+            total = sum(player.hand.values())
+            if total > 7:
+                for n in range(total // 2):
+                    self.drawCard(player, rng)
+
+    def placeRobber(self, player, spot, victim=None, rng=random):
+        """
+        Move the robber to spot and steal from victim, a player name or
+        None. Returns the resource stolen, if any.
+        """
+        self.moveRobber(spot)
+        self.robberPending = False
+        if victim is not None:
+            return self.steal(player, self.player_dic[victim], rng)
+
+    def resolveSeven(self, rng=random, discard=True):
+        """
+        Play out a rolled 7 for the current player: halve the large hands
+        (unless discard is off, e.g. when people choose their own) and
+        move the robber to the tile robber.py scores best. Returns the
+        (spot, victim name or None) placement.
+        """
+        if discard:
+            self.discardHalf(rng)
+        spot, victim = bestRobberMove(self)
+        self.placeRobber(self.current_player, spot, victim, rng)
+        return spot, victim
+
+    def is_robber_valid(self, player, placement):
+        """
+        Check a (spot, victim name or None) robber placement. The robber
+        has to move, and steals whenever there is someone to steal from.
+        """
+        spot, victim = placement
+        if spot not in self.board.spots or spot == self.robber:
+            return False
+        victims = [p.name for p in self.robberVictims(spot, player)]
+        return victim in victims if victims else victim is None
 
 
     def availableMoves(self):
@@ -157,8 +474,8 @@ class Game:
 
             elif len(self.current_player.roads) <= self.round:
                 #then we buy a road
-                for road in self.board.availableEdges:
-                    if tuple(self.lastHouse) in road:
+                for road in self.board.vertexEdges[tuple(self.lastHouse)]:
+                    if road in self.board.availableEdges:
                         roads.append(road)
 
                 settlements = [[None]*11 for i in range(6)]
@@ -193,8 +510,8 @@ class Game:
                     and self.board.vertices[i][q].owner == self.current_player\
                            and self.board.vertices[i][q].val == 1\
                            and self.current_player.hand['wheat'] > 1\
-                           and self.current_player.hand['ore']>2) \
-                           and len(self.current_player.cities) < 4
+                           and self.current_player.hand['ore']>2\
+                           and len(self.current_player.cities) < 4)
 
             cities.append(row)
 
@@ -240,28 +557,29 @@ class Game:
            self.current_player.hand['brick'] > 0) or self.building_roads!=0) and\
            len(self.current_player.roads) < 15:
 
-            for road in self.current_player.roads:
-
+            verts = self.board.vertices
+            seen = set()
 
-                for edge in self.board.availableEdges:
-
-                    intersect = set(road).intersection(set(edge))
-                    if len(intersect) > 0:
+            for road in self.current_player.roads:
 
-                        intersect = list(intersect)[0]
+                for vertex in road:
 
-                        verts = self.board.vertices
+                    #can't build through an opponent's settlement
+                    owner = verts[vertex[0]][vertex[1]].owner
+                    if owner != None and owner != self.current_player:
+                        continue
 
-                        if verts[intersect[0]][intersect[1]].owner == None or \
-                           verts[intersect[0]][intersect[1]].owner == \
-                           self.current_player:
+                    for edge in self.board.vertexEdges[vertex]:
+                        if edge in self.board.availableEdges and \
+                           edge not in seen:
+                            seen.add(edge)
                             roads.append(edge)
 
 
         return roads
 
     def buyableDevCard(self):
-        if len(self.devcards.cards) > 0 and \
+        if len(self.devcards) > 0 and \
            self.current_player.hand['wheat'] > 0 and \
            self.current_player.hand['ore'] > 0 and \
            self.current_player.hand['sheep'] > 0:
@@ -276,10 +594,15 @@ class Game:
         self.player_dic[player].settlements.append(coordinates)
         self.board.availableVertices[coordinates[0]][coordinates[1]] = False
         self.board.propogateVertexPurchase(tuple(coordinates))
+        bit = 1 << self.board.vertexIndex[tuple(coordinates)]
+        self.board.availableVertexMask &= ~bit
+        self.current_player.settlementMask |= bit
         self.lastHouse = coordinates
         self.board.vertices[coordinates[0]][coordinates[1]].owner = \
             self.current_player
         self.board.vertices[coordinates[0]][coordinates[1]].val = 1
+        self.updateProduction(tuple(coordinates))
+        self.longestRoad.addSettlement(tuple(coordinates))
 
         port = self.board.vertices[coordinates[0]][coordinates[1]].port
 
@@ -293,9 +616,9 @@ class Game:
             self.current_player.hand['wood'] -= 1
 
         if self.round == 1:
-            for tile in self.board.spots.values():
-                if list(coordinates) in tile.vertices and tile.resource !=\
-                        'Desert':
+            for spot in self.board.vertexTiles[tuple(coordinates)]:
+                tile = self.board.spots[spot]
+                if tile.resource != 'Desert':
                     self.current_player.hand[tile.resource.lower()] += 1
 
         self.checkLongest()
@@ -305,13 +628,21 @@ class Game:
         self.current_player.hand['wheat'] -= 2
         self.current_player.hand['ore'] -= 3
         self.board.vertices[coordinates[0]][coordinates[1]].val = 2
+        self.updateProduction(tuple(coordinates))
         self.current_player.cities.append(coordinates)
+        self.current_player.cityMask |= \
+            1 << self.board.vertexIndex[tuple(coordinates)]
 
 
     def buyRoad(self, player, road):
         self.player_dic[player].roads.append(road)
         self.board.availableEdges.remove(road)
         self.board.edges[road].owner = self.current_player
+        self.longestRoad.addRoad(self.current_player, road)
+        n = self.board.edgeIndex[road]
+        self.board.availableEdgeMask &= ~(1 << n)
+        self.current_player.roadMask |= 1 << n
+        self.current_player.reachMask |= self.board.edgeVertexMasks[n]
         if self.round > 1 and self.building_roads == 0:
             self.current_player.hand['wood'] -= 1
             self.current_player.hand['brick'] -= 1
@@ -322,7 +653,7 @@ class Game:
         self.checkLongest()
 
     def buyDev(self):
-        card = self.devcards.cards.pop()
+        card = self.devcards.draw()
 
         if card == 'Knight':
             self.current_player.knight += 1
@@ -373,37 +704,7 @@ class Game:
             self.longest_holder = p
 
     def calcLongest(self, player):
-
-        roads = player.roads
-        seen = set()
-
-        def recurse(last_vertex):
-
-            nonlocal roads
-
-            if self.board.vertices[last_vertex[0]][last_vertex[1]].owner and \
-               self.board.vertices[last_vertex[0]][last_vertex[1]].owner != player:
-                return 0
-
-            ans = [0]
-            for road in roads:
-                if last_vertex in road and road not in seen:
-                    seen.add(road)
-                    l_v = set(road) - set([last_vertex])
-                    ans.append(1 + recurse(list(l_v)[0]))
-
-
-            return max(ans)
-
-        lengths = [1]
-
-        for road in roads:
-
-            if road not in seen:
-                seen.add(road)
-                lengths.append(1 + recurse(road[0]) + recurse(road[1]))
-
-        return max(lengths)
+        return self.longestRoad.length(player)
 
     def playedKnight(self):
 
@@ -1,100 +1,66 @@
-from game import Game
+from game import Game, WIN_POINTS
 from player import Player
 from robot import Robot
+from movegen import legalMoves
+from encoder import encode, CandidateBatch
+from actions import encode as encodeAction
+from opening import openingMove
+from vector_game import COLORS
+import multiprocessing
 import random
-import copy
-import functools
+import json
+import time
 
 
 def getState(game):
-   # homes,cities,roads = game.availableMoves()
-    playerBoard =  [[0]*21 for i in range(11)]
-    opposingBoard = [[0]*21 for i in range(11)]
-
-    for i in range(len(game.board.vertices)):
-        for q in range(len(game.board.vertices[0])):
-            if game.board.vertices[i][q]:
-                if game.board.vertices[i][q].owner == game.current_player:
-                    playerBoard[i*2][q*2] = 1 + int(game.board.vertices[i][q] == True)
-                elif game.board.vertices[i][q].owner:
-                    opposingBoard[i*2][q*2] = 1
-
-            if ((i,q),(i,q+1)) in game.board.edges:
-                if game.board.edges[((i,q),(i,q+1))].owner == game.current_player:
-                    playerBoard[i*2][q*2+1] = 1
-                elif game.board.edges[((i,q),(i,q+1))].owner:
-                    opposingBoard[i*2][q*2+1] = 1
-
-            if ((i,q),(i+1,q)) in game.board.edges:
-                if game.board.edges[((i,q),(i+1,q))].owner == game.current_player:
-                    playerBoard[i*2+1][q*2] = 1
-                elif game.board.edges[((i,q),(i+1,q))].owner:
-                    opposingBoard[i*2+1][q*2] = 1
-
-    state = [playerBoard,opposingBoard]
-    for key in game.current_player.hand:
-        state.append([[game.current_player.hand[key]]*21 for i in range(11)])
-
-    state.append([[len(game.current_player.cities)]*21 for i in range(11)])
-    state.append([[game.current_player.played_knights]*21 for i in range(11)])
-    state.append([[game.current_player.point_cards]*21 for i in range(11)])
-
-    return state
+    """(10, 11, 21) uint8 planes of the game for the current player."""
+    return encode(game)
 
 def switch(game,state,r1,r2,v1,v2):
+    """Hand plane deltas of trading v1 of r1 for one r2."""
     hand = game.current_player.hand
     key_index = {key:i+2 for key,i in zip(hand.keys(),list(range(5)))}
-    c_state = copy.deepcopy(state)
-    c_state[key_index[r1]] = [[hand[r1] - v1]*21]*11
-    c_state[key_index[r2]] = [[hand[r2] + 1]*21]*11
-    return c_state
+    return ((key_index[r1], hand[r1] - v1), (key_index[r2], hand[r2] + 1))
 
 def processActions(game,state):
-
+    """
+    Candidate actions and their successor states, as a CandidateBatch of
+    deltas on state. The first action, 'E', ends the turn.
+    """
     actions = [['E',[]]]
-    new_states = [copy.deepcopy(state)]
-    game.availableMoves()
-    moves = game.moves
-    shtetles = moves['settlements']
-
-    for i in range(len(shtetles)):
-        for q in range(len(shtetles[0])):
-            if shtetles[i][q]:
-                c_state = copy.deepcopy(state)
-                # board level
-                c_state[0][i*2][q*2] = 1
-                actions.append(['S',(i,q)])
-                new_states.append(c_state)
-
-    cities = [[]]
-    if 'cities' in moves:
-        cities = moves['cities']
-
-    for i in range(len(cities)):
-        for q in range(len(cities[0])):
-            if cities[i][q]:
-                c_state = copy.deepcopy(state)
-                # board level
-                c_state[0][i*2][q*2] = 2
-                actions.append(['C',(i,q)])
-                new_states.append(c_state)
-
-
-    roads = moves['roads']
+    new_states = CandidateBatch(state)
+    new_states.add()
+    game.current_player.updateScore()
+    moves = legalMoves(game)
+
+    for kind, spec in moves:
+        if kind == 'settlement':
+            i, q = spec
+            # board level
+            new_states.add(cells=[(0, i*2, q*2, 1)])
+            actions.append(['S',(i,q)])
+
+    for kind, spec in moves:
+        if kind == 'city':
+            i, q = spec
+            # board level
+            new_states.add(cells=[(0, i*2, q*2, 2)])
+            actions.append(['C',(i,q)])
+
+
+    roads = [spec for kind, spec in moves if kind == 'road']
     for v1,v2 in roads:
 
-        c_state = copy.deepcopy(state)
         #downwards road
         if v2[0] - v1[0] == 1:
             #board level
-            c_state[0][v1[0]*2+1][v1[1]*2] = 1
+            new_states.add(cells=[(0, v1[0]*2+1, v1[1]*2, 1)])
 
         #sideways road
         else:
-            c_state[0][v1[0]*2][v1[1]*2+1] = 1
+            new_states.add(cells=[(0, v1[0]*2, v1[1]*2+1, 1)])
 
         actions.append(['R',(v1,v2)])
-        new_states.append(c_state)
 
     #trades
     hand = game.current_player.hand
@@ -103,29 +69,68 @@ def processActions(game,state):
         if game.current_player.ports[resource] and hand[resource] >= 2:
             for el in hand.keys():
                 if el != resource:
-                    new_states.append(switch(game,state,resource,el,2,1))
+                    new_states.add(planes=switch(game,state,resource,el,2,1))
                     actions.append(['T',(resource,el,2,1)])
 
         elif hand[resource] >= 3 and  game.current_player.ports['3:1']:
             for el in hand:
                 if el != resource:
-                    new_states.append(switch(game,state,resource,el,3,1))
+                    new_states.add(planes=switch(game,state,resource,el,3,1))
                     actions.append(['T',(resource,el,3,1)])
 
         elif hand[resource] >= 4:
             for el in hand:
                 if el!= resource:
-                    new_states.append(switch(game,state,resource,el,4,1))
+                    new_states.add(planes=switch(game,state,resource,el,4,1))
                     actions.append(['T',(resource,el,4,1)])
 
     return new_states,actions
 
-#this is where the network will be
-def selectAction(game,new_states,actions):
-
+def randomPolicy(game,new_states,actions):
+    """Uniform pick, never ending a set up turn while pieces remain."""
     i = random.randint(0,len(actions)-1)
     if game.round < 2 and len(actions) > 1:
         i = random.randint(1,len(actions)-1)
+    return i
+
+def greedyPolicy(game,new_states,actions):
+    """
+    Set up placements from the opening solver, then build cities, then
+    settlements, then roads, else end the turn.
+    """
+    opening = openingMove(game)
+    if opening is not None:
+        target = encodeAction(opening)
+        for i,action in enumerate(actions):
+            if encodeAction(action) == target:
+                return i
+
+    for kind in 'CSR':
+        options = [i for i,(action,spec) in enumerate(actions) if action == kind]
+        if options:
+            return random.choice(options)
+    return 0
+
+class NetworkPolicy:
+    """
+    Picks the candidate whose successor state scores highest. evaluator
+    is an inference.InferenceServer in this process or an
+    inference.InferenceClient connected to one.
+    """
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+
+    def __call__(self, game, new_states, actions):
+        scores = self.evaluator.evaluate(new_states.materialize())
+        start = 1 if game.round < 2 and len(actions) > 1 else 0
+        return start + int(scores[start:].argmax())
+
+POLICIES = {'random': randomPolicy, 'greedy': greedyPolicy}
+
+def selectAction(game,new_states,actions,policy=randomPolicy):
+
+    i = policy(game,new_states,actions)
     action,spec = actions[i]
     if action == 'S':
         game.buySettlement(game.current_player.name,spec)
@@ -134,69 +139,144 @@ def selectAction(game,new_states,actions):
     elif action == 'R':
         game.buyRoad(game.current_player.name,spec)
     elif action == 'T':
-        game.current_player.hand[spec[0]] -= spec[2]
-        game.current_player.hand[spec[1]] += spec[3]
+        game.apply_action(game.current_player, ('trade', spec[:3]))
 
     else:
         #print(game.current_player.name)
         #print(game.turn)
         #print(game.current_player.points)
-        won = game.current_player.points >= 10
-        game.turn += 1
-        game.round = game.turn//3
-        game.playerUpdate()
-        if game.round > 1:
-            game.rollDice()
+        won = game.current_player.points >= WIN_POINTS
+        game.endTurn()
         return won
 
-@functools.lru_cache(maxsize= 50)
-def permutations(to_drop,r,hand):
-
-    if to_drop == 0:
-        return [hand]
-    if r == len(hand):
-        return []
-
-    h = list(hand)
-
-    ans = []
-    for i in range(min(hand[r],to_drop)+1):
-
-        nh= h.copy()
-        nh[r] = nh[r] - i
-        for el in permutations(to_drop-i,r+1,tuple(nh)):
-            ans.append(el)
-
-    return ans
-
-def dropCards(game):
-
-    for player in game.players:
-        total = sum(player.hand.values())
-        if total > 7:
-            to_drop = total//2
-
-            perms = permutations(to_drop,0,tuple(player.hand.values()))
-            #print(player.hand)
-            #print(player.hand.values())
-            #print(perms)
-            randHand = perms[random.randint(0,len(perms)-1)]
-            for key,i in zip(player.hand,range(5)):
-                player.hand[key] = randHand[i]
-
-
-
-def threeBot():
-
-    bots = [Robot() for i in range(3)]
-    game = Game(player_names = [bot.name for bot in bots])
-    for i in range(500):
-        if game.dieRoll == 7:
-            dropCards(game)
+def playGame(policies, seed=None, max_steps=5000, record=False):
+    """
+    Play one headless game, policies[i] choosing for seat i. A policy is
+    a name from POLICIES or a function (game, new_states, actions) -> index.
+    With record, the result also holds the uint8 states, the chosen
+    actions as actions.py ids and an outcome per step: 1 if the player to
+    move went on to win, else 0.
+    """
+    if seed is not None:
+        random.seed(seed)
+    policies = [POLICIES.get(policy, policy) for policy in policies]
+    names = ['bot%d' % seat for seat in range(len(policies))]
+    game = Game(player_names = names, colors = COLORS[:len(names)])
+    seats = {name: seat for seat, name in enumerate(names)}
+
+    winner = None
+    states, chosen, movers = [], [], []
+    for step in range(max_steps):
+        if game.robberPending:
+            game.resolveSeven()
         state = getState(game)
         new_states, actions = processActions(game,state)
-        if selectAction(game,new_states,actions):
-            print(i)
+        player = game.current_player
+        policy = policies[seats[player.name]]
+        if record:
+            # wrap the policy to see which candidate it picks
+            picked = policy(game,new_states,actions)
+            policy = lambda *args: picked
+            states.append(state)
+            chosen.append(encodeAction(actions[picked]))
+            movers.append(player.name)
+        if selectAction(game,new_states,actions,policy):
+            winner = player.name
             break
 
-threeBot()
+    result = {'seed': seed, 'winner': winner, 'steps': step + 1,
+              'turns': game.turn,
+              'points': [player.points for player in game.players]}
+    if record:
+        import numpy as np
+        result['records'] = (
+            np.array(states, np.uint8),
+            np.array(chosen, np.int32),
+            np.array([name == winner for name in movers], np.int8))
+    return result
+
+def playTask(task):
+    policies, seed, max_steps, record = task
+    return playGame(policies, seed, max_steps, record)
+
+def selfPlay(games, policies=('random',) * 3, workers=None, seed=0,
+             out='selfplay.jsonl', max_steps=5000, data=None):
+    """
+    Play games across a process pool and append one JSON line per game to
+    out. Game i is seeded with seed + i so any game can be replayed alone.
+    With data, every step is also written to a dataset.DatasetWriter in
+    that directory. Returns games/sec and steps/sec.
+    """
+    writer = None
+    if data is not None:
+        from dataset import DatasetWriter
+        writer = DatasetWriter(data)
+
+    start = time.perf_counter()
+    steps = 0
+    tasks = [(tuple(policies), seed + i, max_steps, writer is not None)
+             for i in range(games)]
+    with multiprocessing.Pool(workers) as pool, open(out, 'a') as f:
+        for result in pool.imap_unordered(playTask, tasks, chunksize=4):
+            steps += result['steps']
+            if writer is not None:
+                writer.addMany(*result.pop('records'))
+            f.write(json.dumps(result) + '\n')
+    if writer is not None:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {'games': games, 'seconds': elapsed,
+            'games_per_sec': games / elapsed,
+            'steps_per_sec': steps / elapsed}
+
+def threeBot():
+    result = playGame(['random'] * 3)
+    if result['winner']:
+        print(result['steps'])
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Headless self-play')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='selfplay.jsonl')
+    parser.add_argument('--max-steps', type=int, default=5000)
+    parser.add_argument('--policies', nargs='+', default=['random'] * 3)
+    parser.add_argument('--data', default=None,
+                        help='directory to write training records to')
+    parser.add_argument('--model', default=None,
+                        help='MLP weights (.npz) for "network" seats')
+    parser.add_argument('--analysis-dir', default=None,
+                        help='directory to share board analyses through')
+    args = parser.parse_args()
+
+    if args.analysis_dir:
+        import analysis, os
+
+        # the environment carries the directory to spawned workers too
+        os.environ['BOARD_ANALYSIS_DIR'] = args.analysis_dir
+        analysis.cache.directory = args.analysis_dir
+
+    policies = args.policies
+    server = None
+    if 'network' in policies:
+        from inference import MLP, InferenceServer, InferenceClient
+
+        model = MLP.load(args.model) if args.model else MLP()
+        server = InferenceServer(model)
+        network = NetworkPolicy(InferenceClient(server.listen()))
+        policies = [network if policy == 'network' else policy
+                    for policy in policies]
+
+    stats = selfPlay(args.games, policies, args.workers, args.seed,
+                     args.out, args.max_steps, args.data)
+    if server is not None:
+        stats['batch'] = server.evaluated / max(server.batches, 1)
+        server.stop()
+    print('%(games)d games in %(seconds).1fs: %(games_per_sec).2f games/s, '
+          '%(steps_per_sec).0f steps/s' % stats)
+    if server is not None:
+        print('mean inference batch %(batch).1f states' % stats)
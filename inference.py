@@ -0,0 +1,235 @@
+from encoder import SHAPE
+from multiprocessing.connection import Listener, Client
+from multiprocessing import current_process
+import numpy as np
+import threading
+import queue
+import time
+
+# seconds evaluate waits for a result before giving up
+RESULT_TIMEOUT = 60.0
+
+
+class MLP:
+    """
+    Small NumPy multilayer perceptron scoring encoded states in [-1, 1].
+
+    Stands in for the real network: anything with the same call
+    signature, (N, PLANES, 11, 21) states in, (N,) scores out, can be
+    served instead.
+    """
+
+    def __init__(self, hidden=(128, 64), seed=0):
+        rng = np.random.default_rng(seed)
+        sizes = [int(np.prod(SHAPE))] + list(hidden) + [1]
+        self.weights = [(rng.standard_normal((a, b)) / np.sqrt(a))
+                        .astype(np.float32) for a, b in zip(sizes, sizes[1:])]
+        self.biases = [np.zeros(b, np.float32) for b in sizes[1:]]
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        model = cls.__new__(cls)
+        n = len(data.files) // 2
+        model.weights = [data['w%d' % i] for i in range(n)]
+        model.biases = [data['b%d' % i] for i in range(n)]
+        return model
+
+    def save(self, path):
+        arrays = {}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays['w%d' % i] = w
+            arrays['b%d' % i] = b
+        np.savez(path, **arrays)
+
+    def __call__(self, states):
+        x = np.asarray(states, np.float32).reshape(len(states), -1)
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.maximum(x @ w + b, 0)
+        return np.tanh(x @ self.weights[-1] + self.biases[-1])[:, 0]
+
+
+class Request:
+    """
+    States waiting for the server, and their scores, or the error that
+    evaluating them raised, once done.
+    """
+
+    __slots__ = ('states', 'scores', 'error', 'done')
+
+    def __init__(self, states):
+        self.states = states
+        self.scores = None
+        self.error = None
+        self.done = threading.Event()
+
+    def fail(self, error):
+        self.error = error
+        self.done.set()
+
+    def result(self, timeout=RESULT_TIMEOUT):
+        if not self.done.wait(timeout):
+            raise TimeoutError('no inference result after %ss' % timeout)
+        if self.error is not None:
+            raise self.error
+        return self.scores
+
+
+class InferenceServer:
+    """
+    Batches evaluation requests from many games into single model calls.
+
+    A worker thread takes requests off a queue and keeps adding to the
+    batch until it holds max_batch states or max_latency seconds have
+    passed since its first request. Threads in this process call evaluate
+    or submit directly; other processes connect an InferenceClient to
+    the address returned by listen.
+    """
+
+    def __init__(self, model, max_batch=512, max_latency=0.002):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.queue = queue.Queue()
+        self.thread = None
+        self.listener = None
+        self.batches = 0
+        self.evaluated = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+        # nothing will serve requests still queued, fail them
+        while True:
+            try:
+                request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.fail(RuntimeError('inference server stopped'))
+
+    def submit(self, states):
+        """Queue states for evaluation and return the pending Request."""
+        self.start()
+        request = Request(np.asarray(states))
+        self.queue.put(request)
+        return request
+
+    def evaluate(self, states, timeout=RESULT_TIMEOUT):
+        return self.submit(states).result(timeout)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            request = self.queue.get()
+            if request is None:
+                break
+
+            batch = [request]
+            size = len(request.states)
+            deadline = time.perf_counter() + self.max_latency
+            while size < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+                size += len(request.states)
+
+            # a failing batch fails its requests, not the server
+            try:
+                scores = self.model(np.concatenate([r.states for r in batch]))
+            except Exception as error:
+                for request in batch:
+                    request.fail(error)
+                continue
+            self.batches += 1
+            self.evaluated += size
+
+            start = 0
+            for request in batch:
+                end = start + len(request.states)
+                request.scores = scores[start:end]
+                request.done.set()
+                start = end
+
+    def listen(self, address=None):
+        """Serve InferenceClients on a local socket, returns its address."""
+        self.start()
+        self.listener = Listener(address, authkey=current_process().authkey)
+        threading.Thread(target=self.accept, daemon=True).start()
+        return self.listener.address
+
+    def accept(self):
+        while self.listener is not None:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.serveClient, args=(connection,),
+                             daemon=True).start()
+
+    def serveClient(self, connection):
+        with connection:
+            while True:
+                try:
+                    states = connection.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    result = self.evaluate(states)
+                except Exception as error:
+                    result = error  # re-raised by the client
+                connection.send(result)
+
+
+class InferenceClient:
+    """
+    Connection to an InferenceServer in another process.
+
+    Picklable, so it can be handed to pool workers: each process opens
+    its own connection on first use.
+    """
+
+    def __init__(self, address, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self.connection = None
+
+    def __getstate__(self):
+        return {'address': self.address, 'authkey': self.authkey,
+                'connection': None}
+
+    def evaluate(self, states):
+        if self.connection is None:
+            self.connection = Client(self.address, authkey=self.authkey or
+                                     current_process().authkey)
+        self.connection.send(np.asarray(states))
+        result = self.connection.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
@@ -0,0 +1,193 @@
+class LongestRoad:
+    """
+    Incremental longest road tracker.
+
+    Every player's roads are split into connected components. The longest
+    trail of each component is cached and only recomputed when a road is
+    added to it or an opponent settles on one of its vertices.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.networks = {}
+        self.last = None  # undo token of the most recent add
+
+    def clone(self, board, players={}):
+        """Copy the road networks onto board, remapping their players."""
+        engine = LongestRoad(board)
+        engine.networks = {players.get(player, player): network.clone()
+                           for player, network in self.networks.items()}
+        return engine
+
+    def network(self, player):
+        if player not in self.networks:
+            self.networks[player] = RoadNetwork()
+        return self.networks[player]
+
+    def length(self, player):
+        """Length of the player's longest road."""
+        if player not in self.networks:
+            return 0
+        return self.networks[player].longest()
+
+    def addRoad(self, player, road):
+        """Add a road for player and refresh the component it joins."""
+        network = self.network(player)
+        cid, merged = network.add(road)
+        network.lengths[cid] = self.calcComponent(player, network, cid)
+        self.last = (network, road, cid, merged)
+
+    def addSettlement(self, vertex):
+        """Recompute opponents' components cut by a settlement at vertex."""
+        owner = self.board.vertices[vertex[0]][vertex[1]].owner
+        changed = []
+        for player, network in self.networks.items():
+            if player == owner or vertex not in network.graph:
+                continue
+
+            for cid in set(network.component[edge]
+                           for edge in network.graph[vertex]):
+                changed.append((network, cid, network.lengths[cid]))
+                network.lengths[cid] = self.calcComponent(player, network,
+                                                          cid)
+        self.last = changed
+
+    def undoRoad(self, token):
+        """Revert the addRoad that produced token."""
+        network, road, cid, merged = token
+        network.remove(road, cid, merged)
+
+    def undoSettlement(self, token):
+        """Revert the addSettlement that produced token."""
+        for network, cid, length in token:
+            network.lengths[cid] = length
+
+    def calcComponent(self, player, network, cid):
+        """Longest trail through one component of the player's roads."""
+        graph = network.graph
+        vertices = self.board.vertices
+        best = 0
+        used = set()
+
+        def walk(vertex, length):
+            nonlocal best
+            if length > best:
+                best = length
+
+            # a road can end at an opponent's settlement but not pass it
+            owner = vertices[vertex[0]][vertex[1]].owner
+            if length and owner and owner != player:
+                return
+
+            for edge in graph[vertex]:
+                if edge not in used:
+                    used.add(edge)
+                    walk(edge[1] if edge[0] == vertex else edge[0],
+                         length + 1)
+                    used.discard(edge)
+
+        starts = set(v for edge in network.members[cid] for v in edge)
+        for vertex in starts:
+            walk(vertex, 0)
+
+        return best
+
+
+class RoadNetwork:
+    """One player's road graph, split into connected components."""
+
+    def __init__(self):
+        self.graph = {}  # vertex -> list of owned edges touching it
+        self.component = {}  # edge -> component id
+        self.members = {}  # component id -> set of edges
+        self.lengths = {}  # component id -> cached longest trail
+        self.nextId = 0
+
+    def clone(self):
+        network = RoadNetwork()
+        network.graph = {v: list(edges) for v, edges in self.graph.items()}
+        network.component = dict(self.component)
+        network.members = {cid: set(m) for cid, m in self.members.items()}
+        network.lengths = dict(self.lengths)
+        network.nextId = self.nextId
+        return network
+
+    def add(self, road):
+        """
+        Add road, merging the components it touches. Returns the new
+        component id and the (id, members, length) of each one it replaced.
+        """
+        touching = set()
+        for vertex in road:
+            for edge in self.graph.get(vertex, ()):
+                touching.add(self.component[edge])
+
+        cid = self.nextId
+        self.nextId += 1
+        members = set([road])
+        merged = []
+        for old in touching:
+            merged.append((old, self.members.pop(old), self.lengths.pop(old)))
+            members |= merged[-1][1]
+
+        for edge in members:
+            self.component[edge] = cid
+
+        self.members[cid] = members
+        self.lengths[cid] = 0
+
+        for vertex in road:
+            self.graph.setdefault(vertex, []).append(road)
+
+        return cid, merged
+
+    def remove(self, road, cid, merged):
+        """Take back the most recent add, restoring the merged components."""
+        for vertex in road:
+            self.graph[vertex].remove(road)
+            if not self.graph[vertex]:
+                del self.graph[vertex]
+
+        del self.members[cid]
+        del self.lengths[cid]
+        del self.component[road]
+        for old, members, length in merged:
+            self.members[old] = members
+            self.lengths[old] = length
+            for edge in members:
+                self.component[edge] = old
+
+        self.nextId -= 1
+
+    def longest(self):
+        return max(self.lengths.values(), default=0)
+
+
+def bruteForceLongest(roads, blocked=()):
+    """
+    Reference longest road: enumerate every trail over the given roads.
+
+    Exponential, only meant to check LongestRoad against. Trails may end at
+    a blocked vertex but never pass through one.
+    """
+    roads = list(roads)
+    blocked = set(blocked)
+    best = 0
+    stack = []
+    for road in roads:
+        stack.append((road[0], road[1], (road,)))
+        stack.append((road[1], road[0], (road,)))
+
+    while stack:
+        start, end, trail = stack.pop()
+        best = max(best, len(trail))
+        if end in blocked:
+            continue
+
+        for road in roads:
+            if road not in trail and end in road:
+                other = road[1] if road[0] == end else road[0]
+                stack.append((start, other, trail + (road,)))
+
+    return best
+
@@ -0,0 +1,187 @@
+from robot import Robot
+from rollout import rollout as playout
+from game import WIN_POINTS
+import random
+import math
+import time
+
+
+class Node:
+    """
+    Node of an MCTSRobot search tree, reached by playing action.
+
+    The tree is open loop: dice make the state under a node differ between
+    visits, so a node only stores statistics and the Zobrist key of the
+    state it was first reached in. value is the total reward of player,
+    the player who chose action.
+    """
+
+    __slots__ = ('action', 'parent', 'player', 'key', 'children', 'visits',
+                 'value')
+
+    def __init__(self, action=None, parent=None, player=None, key=None):
+        self.action = action
+        self.parent = parent
+        self.player = player
+        self.key = key
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self, actions, exploration):
+        """UCT pick among the children whose action is legal right now."""
+        log_visits = math.log(self.visits)
+        return max((self.children[action] for action in actions),
+                   key=lambda child: child.value / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTSRobot(Robot):
+    def __init__(self, name="Bot", iterations=1000, time_limit=1.0,
+                 rollout_depth=30, exploration=1.4, rollout_policy='heuristic'):
+        super().__init__(name, time_limit=time_limit)
+        self.iterations = iterations  # None for no limit
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.rollout_policy = rollout_policy  # 'heuristic' or 'random'
+
+        # Nodes of the last tree by the key of the state they were first
+        # reached in, so the next search can start from a matching subtree
+        self.tree = {}
+        self.root = None
+
+    def take_action(self, game):
+        """
+        Run Monte Carlo Tree Search from the current state and return the
+        most visited action.
+        """
+        forced = self.forced_action(game, self.moves(game))
+        if forced is not None:
+            return forced
+
+        try:
+            root = self.build_tree(game)
+        finally:
+            self.end_search(game)
+        actions = [action for action in self.moves(game)
+                   if action in root.children]
+        if not actions:
+            return ('no_action', None)
+
+        best_action = max(actions, key=lambda a: root.children[a].visits)
+        self.index(root)
+        return self.execute_action(game, best_action)
+
+    def build_tree(self, game):
+        """Grow the tree for the current state within the budget."""
+        self.begin_search(game)
+
+        root = self.tree.get(game.hashKey)
+        if root is None:
+            root = Node(key=game.hashKey)
+        root.parent = None
+        self.root = root
+        self.tree = {}
+
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+
+        self.nodes = 0
+        while self.iterations is None or self.nodes < self.iterations:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.nodes += self.iterate(game, root)
+
+        return root
+
+    def index(self, node):
+        """Record node and its subtree in self.tree for reuse."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.tree.setdefault(node.key, node)
+            stack.extend(node.children.values())
+
+    def moves(self, game):
+        """Actions for the current player, ending the turn included."""
+        actions = self.get_valid_actions(game)
+        # In setup the turn only ends once the free pieces are placed
+        if game.round >= 2 or not actions:
+            actions.append(('end_turn', None))
+        return actions
+
+    def play(self, game, action):
+        """Apply action in place and return its undo record."""
+        player = game.current_player
+        record = game.apply_action(player, action)
+        if record is not None:
+            player.updateScore()
+        return record
+
+    def finished(self, game):
+        return any(player.points >= WIN_POINTS for player in game.players)
+
+    def iterate(self, game, root):
+        """
+        One selection, expansion, rollout and backpropagation pass.
+        Returns the number of rollouts played.
+        """
+        path, records = self.descend(game, root)
+        self.backpropagate(path, self.rollout(game))
+        for record in reversed(records):
+            game.undo_action(record)
+        return 1
+
+    def descend(self, game, root):
+        """
+        Select down the tree from root and expand one new node, playing
+        the actions in game. Returns the path and the undo records.
+        """
+        records = []
+        path = [root]
+        node = root
+
+        while not self.finished(game):
+            actions = self.moves(game)
+            untried = [action for action in actions
+                       if action not in node.children]
+            if untried:
+                action = random.choice(untried)
+                player = game.current_player.name
+                record = self.play(game, action)
+                if record is None:
+                    break
+                records.append(record)
+                child = Node(action, node, player, game.hashKey)
+                node.children[action] = child
+                path.append(child)
+                break
+
+            node = node.select(actions, self.exploration)
+            record = self.play(game, node.action)
+            if record is None:
+                break
+            records.append(record)
+            path.append(node)
+
+        return path, records
+
+    def backpropagate(self, path, reward, visits=1):
+        for node in path:
+            node.visits += visits
+            node.value += reward.get(node.player, 0.0)
+
+    def rollout(self, game):
+        """
+        Play a clone of game on with the rollout policy and return each
+        player's reward.
+        """
+        simulation = game.clone()
+        playout(simulation, self.rollout_policy, self.rollout_depth)
+        return self.reward(simulation)
+
+    def reward(self, game):
+        """1 for a winner, otherwise the share of the points needed to win."""
+        return {player.name: min(player.points, WIN_POINTS) / WIN_POINTS
+                for player in game.players}
@@ -0,0 +1,76 @@
+def bits(mask):
+    """Indices of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def legalMasks(game):
+    """
+    Legal moves of the current player as bitmasks: (settlements, cities,
+    roads, dev_card), vertex and edge numbers as in Board.vertexList and
+    Board.edgeList. Same rules as Game.availableMoves, including the set
+    up rounds.
+    """
+    board = game.board
+    player = game.current_player
+    hand = player.hand
+    settlements = cities = roads = 0
+    dev_card = False
+
+    # set up rounds: a free settlement, then a free road next to it
+    if game.round < 2:
+        if len(player.settlements) == len(player.roads) and \
+                len(player.settlements) <= game.round:
+            settlements = board.availableVertexMask
+
+        elif len(player.roads) <= game.round:
+            n = board.vertexIndex[tuple(game.lastHouse)]
+            roads = board.vertexEdgeMasks[n] & board.availableEdgeMask
+
+        return settlements, cities, roads, dev_card
+
+    if hand['wheat'] > 0 and hand['sheep'] > 0 and hand['brick'] > 0 and \
+            hand['wood'] > 0 and len(player.settlements) < 5:
+        settlements = player.reachMask & board.availableVertexMask
+
+    if ((hand['wood'] > 0 and hand['brick'] > 0) or
+            game.building_roads != 0) and len(player.roads) < 15:
+        # roads can't be extended through an opponent's settlement
+        blocked = 0
+        for other in game.players:
+            if other is not player:
+                blocked |= other.settlementMask
+
+        for n in bits(player.reachMask & ~blocked):
+            roads |= board.vertexEdgeMasks[n]
+        roads &= board.availableEdgeMask
+
+    if hand['wheat'] > 1 and hand['ore'] > 2 and len(player.cities) < 4:
+        cities = player.settlementMask & ~player.cityMask
+
+    if len(game.devcards) > 0 and hand['wheat'] > 0 and hand['ore'] > 0 \
+            and hand['sheep'] > 0:
+        dev_card = True
+
+    return settlements, cities, roads, dev_card
+
+
+def legalMoves(game):
+    """
+    Settlement, city, road and dev card actions for the current player.
+
+    Works on the bitmasks kept by Board and Player instead of the 6x11
+    grids of Game.availableMoves, and returns the ('settlement', (i, q)),
+    ('road', edge), ('city', (i, q)) and ('dev_card', None) tuples Robot
+    uses, in that order.
+    """
+    board = game.board
+    settlements, cities, roads, dev_card = legalMasks(game)
+    actions = [('settlement', board.vertexList[n]) for n in bits(settlements)]
+    actions += [('road', board.edgeList[e]) for e in bits(roads)]
+    actions += [('city', board.vertexList[n]) for n in bits(cities)]
+    if dev_card:
+        actions.append(('dev_card', None))
+    return actions
@@ -0,0 +1,150 @@
+from movegen import legalMasks, bits
+from analysis import analyze, RESOURCE
+from packed import HAND
+
+# placement value weights, in pips
+DIVERSITY = 2.0  # per resource produced
+GENERIC_PORT = 1.5  # a 3:1 port
+RESOURCE_PORT = 1.0  # a 2:1 port, plus a third of the pips it can trade
+
+# leaves the placement search may visit, spread over its depth
+SEARCH_LEAVES = 50000
+
+def solverFor(board):
+    """
+    The OpeningSolver of board's layout, built once per layout and kept
+    on its cached BoardAnalysis, so it is evicted along with it.
+    """
+    analysis = analyze(board)
+    if analysis.openingSolver is None:
+        analysis.openingSolver = OpeningSolver(board, analysis)
+    return analysis.openingSolver
+
+
+class OpeningSolver:
+    """
+    Settlement placement for the set up rounds of one board layout.
+
+    Per vertex production in pips per resource and ports come from the
+    layout's BoardAnalysis. A set of placements is valued by its total pips, the
+    number of resources it produces and its ports. solve searches the
+    snake order (game.order, then game.order reversed), every player
+    maximizing the value of their own two settlements, over the best few
+    open vertices per pick. Results are memoized by the placements made
+    so far, so later picks in the same game are free.
+    """
+
+    def __init__(self, board, analysis):
+        self.vertexList = board.vertexList
+        self.edgeList = board.edgeList
+        self.vertexIndex = board.vertexIndex
+        self.edgeVertices = [(board.vertexIndex[a], board.vertexIndex[b])
+                             for a, b in board.edgeList]
+        self.blocks = [board.vertexNeighborMasks[n] | 1 << n
+                       for n in range(len(board.vertexList))]
+        self.neighbors = board.vertexNeighborMasks
+
+        self.production = analysis.production
+        self.ports = analysis.ports
+
+        # value of each vertex on its own, and the vertices best first
+        self.value = [self.placementValue((n,))
+                      for n in range(len(board.vertexList))]
+        self.ranked = sorted(range(len(self.value)),
+                             key=lambda n: -self.value[n])
+        self.memo = {}
+
+    def placementValue(self, placements):
+        production = [0] * len(HAND)
+        for n in placements:
+            for r, p in enumerate(self.production[n]):
+                production[r] += p
+
+        value = sum(production) + DIVERSITY * sum(1 for p in production if p)
+        for port in set(self.ports[n] for n in placements):
+            if port == '3:1':
+                value += GENERIC_PORT
+            elif port:
+                value += RESOURCE_PORT + production[RESOURCE[port]] / 3
+        return value
+
+    def solve(self, placements, schedule, available):
+        """
+        Best next pick for seat schedule[len(placed)], given placements
+        (a tuple of vertex number tuples per seat) and the available
+        vertex mask. Returns (final values per seat, vertex).
+        """
+        step = sum(len(p) for p in placements)
+        if step == len(schedule):
+            return tuple(self.placementValue(p) for p in placements), None
+
+        key = (schedule, tuple(frozenset(p) for p in placements))
+        if key in self.memo:
+            return self.memo[key]
+
+        seat = schedule[step]
+        width = max(2, int(SEARCH_LEAVES ** (1 / len(schedule))))
+        candidates = [n for n in self.ranked if available >> n & 1][:width]
+
+        best = (tuple(self.placementValue(p) for p in placements), None)
+        for n in candidates:
+            placed = list(placements)
+            placed[seat] = placements[seat] + (n,)
+            values, _ = self.solve(tuple(placed), schedule,
+                                   available & ~self.blocks[n])
+            if best[1] is None or values[seat] > best[0][seat]:
+                best = (values, n)
+
+        self.memo[key] = best
+        return best
+
+    def chooseSettlement(self, game):
+        """Vertex number of the current player's opening settlement."""
+        seats = {player.name: seat for seat, player in enumerate(game.players)}
+        order = tuple(seats[name] for name in game.order)
+        schedule = order + order[::-1]
+        placements = tuple(
+            tuple(self.vertexIndex[tuple(v)] for v in player.settlements)
+            for player in game.players)
+
+        values, n = self.solve(placements, schedule,
+                               game.board.availableVertexMask)
+        if n is None:
+            # off the snake order (e.g. a hand edited game), fall back to
+            # the best open vertex
+            n = next(n for n in self.ranked
+                     if game.board.availableVertexMask >> n & 1)
+        return n
+
+    def chooseRoad(self, game, roads):
+        """
+        Edge number, out of the roads mask, pointing at the best vertex
+        still open for a later settlement.
+        """
+        available = game.board.availableVertexMask
+        home = self.vertexIndex[tuple(game.lastHouse)]
+
+        def reach(e):
+            a, b = self.edgeVertices[e]
+            end = b if a == home else a
+            spots = self.neighbors[end] & available & ~self.blocks[home]
+            return max((self.value[n] for n in bits(spots)), default=0)
+
+        return max(bits(roads), key=reach)
+
+
+def openingMove(game):
+    """
+    The solver's set up action for the current player, ('settlement',
+    (i, q)) or ('road', edge), or None outside the set up rounds.
+    """
+    if game.round >= 2:
+        return None
+
+    settlements, cities, roads, dev_card = legalMasks(game)
+    solver = solverFor(game.board)
+    if settlements:
+        return 'settlement', solver.vertexList[solver.chooseSettlement(game)]
+    if roads:
+        return 'road', solver.edgeList[solver.chooseRoad(game, roads)]
+    return None
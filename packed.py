@@ -0,0 +1,219 @@
+from array import array
+
+# fixed codes used by the packed representation
+RESOURCES = ('Desert', 'Ore', 'Wheat', 'Sheep', 'Wood', 'Brick')
+HAND = ('ore', 'wheat', 'sheep', 'wood', 'brick')
+DEV_CARDS = ('Knight', 'Year of Plenty', 'Monoploy', 'Road Builder',
+             'Point Card')
+PORTS = ('3:1', 'brick', 'ore', 'sheep', 'wheat', 'wood')
+NONE = 255  # empty seat / vertex marker in byte fields
+
+
+class PackedState:
+    """
+    Flat, compact copy of a Game.
+
+    Ownership is stored in byte arrays indexed by Board.vertexList and
+    Board.edgeList (0 for nobody, seat + 1 otherwise), hands as one 5-int
+    vector per seat and vertex availability as a bitmask. Edge
+    availability is the complement of edge ownership. Use pack to build
+    one, unpack to write it back into a Game or toGame for a fresh Game,
+    as the parallel search workers do.
+    """
+
+    __slots__ = ('names', 'colors', 'order', 'layout', 'deck', 'drawn',
+                 'vertexOwner', 'vertexLevel', 'edgeOwner', 'available',
+                 'hands', 'devs', 'flags', 'scalars')
+
+    def __init__(self, n_players):
+        self.names = ()
+        self.colors = ()
+        self.order = b''
+        self.layout = b''  # 19 resource codes then 19 rolls (0 = desert)
+        self.deck = b''
+        self.drawn = 0
+        self.vertexOwner = bytearray(54)
+        self.vertexLevel = bytearray(54)
+        self.edgeOwner = bytearray(72)
+        self.available = 0
+        self.hands = array('H', bytes(10 * n_players))
+        # knight, year of plenty, monopoly, road builder, point cards and
+        # played knights per seat
+        self.devs = bytearray(6 * n_players)
+        # port bits, then longest road and largest army bits, per seat
+        self.flags = array('H', bytes(4 * n_players))
+        # turn, round, die roll, rolled, played dev, building roads,
+        # robber, robber tile blocked, last house, longest holder,
+        # largest holder, robber pending
+        self.scalars = array('H', bytes(24))
+
+    def toGame(self):
+        """Build a new Game holding this state."""
+        from game import Game
+
+        game = Game(player_names=list(self.names), colors=list(self.colors))
+        board = game.board
+        for spot in range(1, 20):
+            board.spots[spot].resource = RESOURCES[self.layout[spot - 1]]
+
+        board.rollDic = {spot: self.layout[18 + spot]
+                         for spot in range(1, 20)
+                         if self.layout[18 + spot]}
+        game.devcards.cards = tuple(DEV_CARDS[c] for c in self.deck)
+        unpack(self, game)
+        return game
+
+
+def pack(game):
+    """Pack the state of game into a PackedState."""
+    board = game.board
+    seats = {player: seat + 1 for seat, player in enumerate(game.players)}
+    state = PackedState(len(game.players))
+
+    state.names = tuple(player.name for player in game.players)
+    state.colors = tuple(player.color for player in game.players)
+    state.order = bytes(state.names.index(name) for name in game.order)
+    state.layout = bytes(
+        [RESOURCES.index(board.spots[spot].resource) for spot in range(1, 20)] +
+        [board.rollDic.get(spot, 0) for spot in range(1, 20)])
+    state.deck = bytes(DEV_CARDS.index(card) for card in game.devcards.cards)
+    state.drawn = game.devcards.drawn
+
+    for n, (i, q) in enumerate(board.vertexList):
+        vertex = board.vertices[i][q]
+        if vertex.owner:
+            state.vertexOwner[n] = seats[vertex.owner]
+            state.vertexLevel[n] = vertex.val
+        if board.availableVertices[i][q]:
+            state.available |= 1 << n
+
+    for n, edge in enumerate(board.edgeList):
+        owner = board.edges[edge].owner
+        if owner:
+            state.edgeOwner[n] = seats[owner]
+
+    for seat, player in enumerate(game.players):
+        for r, resource in enumerate(HAND):
+            state.hands[5 * seat + r] = player.hand[resource]
+
+        state.devs[6 * seat:6 * seat + 6] = bytes(
+            (player.knight, player.year_of_plenty, player.monopoly,
+             player.road_builder, player.point_cards, player.played_knights))
+
+        ports = 0
+        for bit, port in enumerate(PORTS):
+            if player.ports[port]:
+                ports |= 1 << bit
+        state.flags[2 * seat] = ports
+        state.flags[2 * seat + 1] = player.longest_road | \
+            player.largest_army << 1
+
+    lastHouse = board.vertexIndex[tuple(game.lastHouse)] \
+        if len(game.lastHouse) else NONE
+    state.scalars[:] = array('H', (
+        game.turn, game.round, game.dieRoll or 0, game.rolled,
+        game.playedDev, game.building_roads, game.robber,
+        board.spots[game.robber].blocked, lastHouse,
+        seats.get(game.longest_holder, 0),
+        seats.get(game.largest_holder, 0), game.robberPending))
+
+    return state
+
+
+def unpack(state, game):
+    """Overwrite the mutable state of game with state."""
+    board = game.board
+    players = game.players
+    owners = (None,) + tuple(players)
+
+    for player in players:
+        player.settlements = []
+        player.cities = []
+        player.roads = []
+        player.settlementMask = 0
+        player.cityMask = 0
+        player.roadMask = 0
+        player.reachMask = 0
+
+    for n, (i, q) in enumerate(board.vertexList):
+        vertex = board.vertices[i][q]
+        vertex.owner = owners[state.vertexOwner[n]]
+        vertex.val = state.vertexLevel[n]
+        vertex.city = True if vertex.val == 2 else None
+        board.availableVertices[i][q] = bool(state.available >> n & 1)
+        if vertex.owner:
+            vertex.owner.settlements.append((i, q))
+            vertex.owner.settlementMask |= 1 << n
+            if vertex.city:
+                vertex.owner.cities.append((i, q))
+                vertex.owner.cityMask |= 1 << n
+    board.availableVertexMask = state.available
+
+    board.availableEdges = set()
+    board.availableEdgeMask = 0
+    for n, edge in enumerate(board.edgeList):
+        owner = owners[state.edgeOwner[n]]
+        board.edges[edge].owner = owner
+        if owner:
+            owner.roads.append(edge)
+            owner.roadMask |= 1 << n
+            owner.reachMask |= board.edgeVertexMasks[n]
+        else:
+            board.availableEdges.add(edge)
+            board.availableEdgeMask |= 1 << n
+
+    for seat, player in enumerate(players):
+        for r, resource in enumerate(HAND):
+            player.hand[resource] = state.hands[5 * seat + r]
+
+        player.knight, player.year_of_plenty, player.monopoly, \
+            player.road_builder, player.point_cards, \
+            player.played_knights = state.devs[6 * seat:6 * seat + 6]
+
+        for bit, port in enumerate(PORTS):
+            player.ports[port] = bool(state.flags[2 * seat] >> bit & 1)
+        player.longest_road = bool(state.flags[2 * seat + 1] & 1)
+        player.largest_army = bool(state.flags[2 * seat + 1] & 2)
+
+    turn, rnd, dieRoll, rolled, playedDev, building_roads, robber, \
+        blocked, lastHouse, longest, largest, robberPending = state.scalars
+    game.order = [state.names[seat] for seat in state.order]
+    game.turn = turn
+    game.round = rnd
+    game.dieRoll = dieRoll or ''
+    game.rolled = bool(rolled)
+    game.playedDev = bool(playedDev)
+    game.building_roads = building_roads
+    game.robberPending = bool(robberPending)
+    game.lastHouse = board.vertexList[lastHouse] if lastHouse != NONE else []
+    game.longest_holder = owners[longest] or ''
+    game.largest_holder = owners[largest] or ''
+    game.devcards.drawn = state.drawn
+
+    if game.round == 1:
+        game.current_player = game.player_dic[
+            game.order[::-1][game.turn % len(players)]]
+    else:
+        game.current_player = game.player_dic[
+            game.order[game.turn % len(players)]]
+
+    # derived tables are rebuilt from the restored ownership
+    game.robber = robber
+    for spot, tile in board.spots.items():
+        tile.blocked = spot == robber and bool(blocked)
+    game.production = {roll: {} for roll in range(2, 13)}
+    for vertex in board.vertexList:
+        game.updateProduction(vertex)
+
+    game.longestRoad = type(game.longestRoad)(board)
+    for player in players:
+        for road in player.roads:
+            game.longestRoad.addRoad(player, road)
+
+    game.availableMoves()
+    for player in players:
+        player.updateScore()
+    if game.zobrist:
+        game.hashKey = game.zobrist.hash(game)
+    if game.evaluator:
+        game.evaluator.refresh(game)
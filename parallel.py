@@ -0,0 +1,143 @@
+from mcts import MCTSRobot
+from packed import pack, unpack, DEV_CARDS
+from collections import OrderedDict
+import multiprocessing
+import random
+import os
+
+# Per worker process caches, least recently used evicted first: a Game
+# per seating and board layout, so a PackedState only has to be
+# unpacked, and an MCTSRobot per set of settings
+WORKER_CACHE_SIZE = 8
+_games = OrderedDict()
+_bots = OrderedDict()
+
+
+def cached(entries, key, make):
+    if key in entries:
+        entries.move_to_end(key)
+        return entries[key]
+    value = entries[key] = make()
+    if len(entries) > WORKER_CACHE_SIZE:
+        entries.popitem(last=False)
+    return value
+
+
+def workerGame(state):
+    """A Game holding state, reusing this worker's Game for the board."""
+    game = cached(_games, (state.names, state.layout), state.toGame)
+    # the deck is shuffled per game, so it is not part of the key
+    game.devcards.cards = tuple(DEV_CARDS[c] for c in state.deck)
+    unpack(state, game)
+    return game
+
+
+def workerBot(name, settings):
+    return cached(_bots, (name,) + settings,
+                  lambda: MCTSRobot(name, *settings))
+
+
+def searchRoot(task):
+    """Independent search of a packed state, returns the root statistics."""
+    state, name, settings, seed = task
+    random.seed(seed)
+    bot = workerBot(name, settings)
+    bot.tree = {}
+    root = bot.build_tree(workerGame(state))
+    return {action: (child.visits, child.value)
+            for action, child in root.children.items()}
+
+
+def rolloutLeaf(task):
+    """Rollout from a packed leaf state, returns each player's reward."""
+    state, name, settings, seed = task
+    random.seed(seed)
+    bot = workerBot(name, settings)
+    return bot.rollout(workerGame(state))
+
+
+class ParallelMCTSRobot(MCTSRobot):
+    """
+    MCTSRobot that spreads its search over a pool of worker processes.
+
+    'root' runs one independent search per worker and sums the visit and
+    value statistics of the root moves. 'leaf' keeps the tree in this
+    process and plays a batch of leaf rollouts per step in the workers.
+    Workers are sent PackedStates, never Game objects.
+    """
+
+    def __init__(self, name="Bot", workers=None, mode='root', **kwargs):
+        super().__init__(name, **kwargs)
+        self.workers = workers or os.cpu_count()
+        self.mode = mode  # 'root' or 'leaf'
+        self.pool = None
+
+    def settings(self):
+        return (self.iterations, self.time_limit, self.rollout_depth,
+                self.exploration, self.rollout_policy)
+
+    def seeds(self):
+        return [random.getrandbits(32) for worker in range(self.workers)]
+
+    def start(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def take_action(self, game):
+        if self.mode != 'root':
+            return super().take_action(game)
+
+        actions = self.moves(game)
+        forced = self.forced_action(game, actions)
+        if forced is not None:
+            return forced
+
+        # each worker searches its share of the iteration budget
+        settings = self.settings()
+        if self.iterations is not None:
+            settings = (-(-self.iterations // self.workers),) + settings[1:]
+        state = pack(game)
+        tasks = [(state, self.name, settings, seed) for seed in self.seeds()]
+
+        stats = {}
+        for result in self.start().map(searchRoot, tasks):
+            for action, (visits, value) in result.items():
+                total = stats.setdefault(action, [0, 0.0])
+                total[0] += visits
+                total[1] += value
+        self.stats = stats
+        self.nodes = sum(visits for visits, value in stats.values())
+
+        actions = [action for action in actions if action in stats]
+        if not actions:
+            return ('no_action', None)
+        best_action = max(actions, key=lambda a: stats[a][0])
+        return self.execute_action(game, best_action)
+
+    def iterate(self, game, root):
+        """
+        Select a batch of leaves, one per worker, and roll them out in the
+        pool. Paths get a virtual visit while the batch is out so the
+        selections spread over the tree.
+        """
+        tasks = []
+        paths = []
+        settings = self.settings()
+        for seed in self.seeds():
+            path, records = self.descend(game, root)
+            tasks.append((pack(game), self.name, settings, seed))
+            paths.append(path)
+            for record in reversed(records):
+                game.undo_action(record)
+            self.backpropagate(path, {}, visits=1)
+
+        for path, reward in zip(paths, self.start().map(rolloutLeaf, tasks)):
+            self.backpropagate(path, reward, visits=0)
+        return len(tasks)
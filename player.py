@@ -1,3 +1,6 @@
+import copy
+
+
 class Player:
     default_colors = ['blue', 'red', 'white', 'orange']
     colors = []
@@ -29,6 +32,12 @@ class Player:
         self.point_cards = 0
         self.ports = {'3:1': False, 'brick': False, 'ore': False, 'sheep': False, 'wheat': False, 'wood': False}
 
+        # bitmasks over Board.vertexList / Board.edgeList for movegen
+        self.settlementMask = 0
+        self.cityMask = 0
+        self.roadMask = 0
+        self.reachMask = 0  # vertices touched by our roads
+
     def updateScore(self):
         self.points = (
             len(self.settlements) +
@@ -37,3 +46,13 @@ class Player:
             2 * self.longest_road +
             2 * self.largest_army
         )
+
+    def clone(self):
+        """Copy of the player with its own hand, buildings and ports."""
+        player = copy.copy(self)
+        player.hand = dict(self.hand)
+        player.settlements = list(self.settlements)
+        player.cities = list(self.cities)
+        player.roads = list(self.roads)
+        player.ports = dict(self.ports)
+        return player
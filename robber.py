@@ -0,0 +1,75 @@
+from analysis import analyze, pips
+
+# rolls the robber is expected to sit on a tile before it moves again
+BLOCKED_ROLLS = 6
+# extra weight on denying a player, per victory point they hold
+LEADER_WEIGHT = 0.1
+
+
+def tileProduction(game, analysis=None):
+    """
+    {spot: {owner: pips}} of what every producing tile pays out to the
+    buildings around it, from the layout's rollTiles and tileVertices.
+    """
+    if analysis is None:
+        analysis = analyze(game.board)
+    board = game.board
+    tiles = {}
+    for roll, spots in analysis.rollTiles.items():
+        n = pips(roll)
+        for spot in spots:
+            paid = tiles[spot] = {}
+            for v in analysis.tileVertices[spot]:
+                i, q = board.vertexList[v]
+                vertex = board.vertices[i][q]
+                if vertex.owner:
+                    paid[vertex.owner] = paid.get(vertex.owner, 0) + \
+                        n * vertex.val
+    return tiles
+
+
+def robberMoves(game, player=None):
+    """
+    Robber placements for player (the current player by default) as
+    (score, spot, victim name or None), best first, over every tile but
+    the robber's current one.
+
+    The score is in cards: the production the tile denies opponents over
+    BLOCKED_ROLLS rolls, weighted towards the leaders, less what it denies
+    player, plus the card stolen. The victim is the leader among the
+    opponents on the tile with cards in hand.
+    """
+    player = player or game.current_player
+    # searches already hold the analysis, skip hashing the layout again
+    tiles = tileProduction(game, game.evaluator.analysis
+                           if game.evaluator else None)
+
+    moves = []
+    for spot in game.board.spots:
+        if spot == game.robber:
+            continue
+
+        score = 0.0
+        for owner, n in tiles.get(spot, {}).items():
+            cards = n / 36 * BLOCKED_ROLLS
+            if owner is player:
+                score -= cards
+            else:
+                score += cards * (1 + LEADER_WEIGHT * owner.points)
+
+        victim = None
+        victims = game.robberVictims(spot, player)
+        if victims:
+            victim = max(victims, key=lambda p: (p.points,
+                                                 sum(p.hand.values()))).name
+            score += 1
+        moves.append((score, spot, victim))
+
+    moves.sort(key=lambda move: -move[0])
+    return moves
+
+
+def bestRobberMove(game, player=None):
+    """(spot, victim name or None) of the best scored robber placement."""
+    score, spot, victim = robberMoves(game, player)[0]
+    return spot, victim
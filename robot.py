@@ -1,35 +1,136 @@
 from player import Player
+from movegen import legalMoves
+from zobrist import Zobrist, TranspositionTable, EXACT, LOWER, UPPER
+from evaluation import Evaluator
+from opening import openingMove
+from robber import bestRobberMove
 import random
 import math
+import time
+
+# Move ordering: higher goes first
+ACTION_PRIORITY = {'city': 3, 'settlement': 2, 'dev_card': 1, 'road': 0,
+                   'end_turn': -1}
+
+# evaluate_game_state is clamped to these in expectimax, Star1 pruning
+# needs hard bounds on leaf values
+EVAL_BOUNDS = (-30.0, 30.0)
+
 
 class Robot(Player):
-    def __init__(self, name="Bot"):
+    def __init__(self, name="Bot", time_limit=1.0, node_limit=None, max_depth=6,
+                 search='alphabeta'):
         super().__init__(name, "Purple")
         self.is_bot = True  # Additional flag to identify a bot player
+        self.table = None  # TranspositionTable, made by the first search
+
+        # Search budget: take_action deepens until one of these runs out
+        self.time_limit = time_limit  # seconds, None for no limit
+        self.node_limit = node_limit  # alpha_beta calls, None for no limit
+        self.max_depth = max_depth
+        self.search = search  # 'alphabeta' or 'expectimax'
+        self.nodes = 0
+        self.depth = 0
+        self.deadline = None
+        self.stopped = False
+
+        # Move ordering state: two killer moves per ply, a history score per
+        # action and the number of cut-offs found by each ordering source
+        self.killers = []
+        self.history = {}
+        self.cutoffs = {'tt': 0, 'killer': 0, 'history': 0, 'type': 0}
+        self.pv_move = None
 
     def take_action(self, game):
         """
         Use Alpha-Beta Pruning to decide the best action during the bot's turn.
+
+        Searches depth 1, 2, ... up to max_depth and keeps the best move of
+        the deepest search that finished inside the time and node budget.
         """
-        moves = game.moves
-        actions = []
+        actions = self.get_valid_actions(game)
+        forced = self.forced_action(game, actions)
+        if forced is not None:
+            return forced
+
+        self.begin_search(game)
+        game.evaluator = Evaluator(game)
+        if self.table is None:
+            self.table = TranspositionTable()
+        self.table.newSearch()
 
-        if 'settlements' in moves:
-            actions += [('settlement', (i, q)) for i, row in enumerate(moves['settlements']) for q, valid in enumerate(row) if valid]
-        if 'roads' in moves:
-            actions += [('road', road) for road in moves['roads']]
-        if 'cities' in moves:
-            actions += [('city', (i, q)) for i, row in enumerate(moves['cities']) for q, valid in enumerate(row) if valid]
-        if moves.get('dev_card', False):
-            actions.append(('dev_card', None))
+        self.nodes = 0
+        self.stopped = False
+        self.deadline = None
+        self.pv_move = None
+        self.killers = [[] for depth in range(self.max_depth + 1)]
+        self.history = {action: score // 2 for action, score in self.history.items() if score > 1}
+        self.cutoffs = dict.fromkeys(self.cutoffs, 0)
+        if self.time_limit is not None:
+            self.deadline = time.perf_counter() + self.time_limit
+
+        # Perform Alpha-Beta Pruning to choose the best action
+        try:
+            best_action = self.deepen(game, actions)
+        finally:
+            self.end_search(game)
+
+        if best_action is None:
+            return ('no_action', None)
+        return self.execute_action(game, best_action)
+
+    def forced_action(self, game, actions):
+        """
+        Play and return the move that needs no search, if there is one:
+        the robber placement after a 7, ('no_action', None) when actions
+        is empty, or the opening solver's set up placement.
+        """
+        # After rolling a 7 the robber moves first, placed by its scorer
+        if game.robberPending:
+            return self.execute_action(
+                game, ('robber', bestRobberMove(game, self)))
 
-        # If no actions are available
         if not actions:
             return ('no_action', None)
 
-        # Perform Alpha-Beta Pruning to choose the best action
-        best_action, _ = self.alpha_beta(game, depth=3, alpha=-math.inf, beta=math.inf, maximizing_player=True, valid_actions=actions)
+        # Set up placements come from the opening solver
+        opening = openingMove(game)
+        if opening is not None:
+            return self.execute_action(game, opening)
+        return None
+
+    def begin_search(self, game):
+        """Hash the root once, apply_action keeps the key up to date."""
+        game.zobrist = Zobrist.forPlayers(len(game.players))
+        game.hashKey = game.zobrist.hash(game)
 
+    def end_search(self, game):
+        # real moves skip apply_action, so the search's key and
+        # evaluator would only go stale on the live game
+        game.zobrist = None
+        game.evaluator = None
+
+    def deepen(self, game, actions):
+        """Iterative deepening; the best action of the deepest finished search."""
+        best_action = None
+        for depth in range(1, self.max_depth + 1):
+            self.depth = depth
+            if self.search == 'expectimax':
+                action, _ = self.expectimax(game, depth, -math.inf, math.inf, actions)
+            else:
+                action, _ = self.alpha_beta(game, depth=depth, alpha=-math.inf, beta=math.inf, maximizing_player=True, valid_actions=actions)
+            if self.stopped:
+                break  # Unfinished iteration, keep the previous result
+            best_action = action
+            if best_action is None:
+                break
+
+            # Search the previous iteration's best move first
+            self.pv_move = best_action
+        return best_action
+
+    def execute_action(self, game, best_action):
+        """Announce the chosen action, buying the dev card if it is one."""
         # Execute the chosen action
         if best_action[0] == 'settlement':
             print("The Bot Built a Settlement!")
@@ -40,104 +141,297 @@ class Robot(Player):
         elif best_action[0] == 'dev_card':
             game.buyDev()
             print("The Bot Built a Dev Card!")
+        elif best_action[0] == 'robber':
+            print("The Bot Moved the Robber!")
 
         return best_action
 
     def alpha_beta(self, game, depth, alpha, beta, maximizing_player, valid_actions):
         """
         Alpha-Beta Pruning algorithm to evaluate the best action.
+
+        Positions are looked up in the transposition table by the game's
+        Zobrist key when take_action has enabled hashing.
         """
+        self.nodes += 1
+        if self.out_of_budget():
+            self.stopped = True
+        if self.stopped:
+            return None, 0
+
         if depth == 0 or not valid_actions:
             return None, self.evaluate_game_state(game)
 
+        ply = self.depth - depth
+        tt_move = self.pv_move if ply == 0 else None
+
+        key = None
+        if game.zobrist:
+            key = game.hashKey
+            if not maximizing_player:
+                key ^= game.zobrist.sideKey
+
+            entry = self.table.probe(key)
+            if entry is not None:
+                _, entry_depth, value, flag, move, _ = entry
+                if entry_depth >= depth:
+                    if flag == EXACT:
+                        return move, value
+                    elif flag == LOWER:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if beta <= alpha:
+                        return move, value
+                tt_move = move
+
+        valid_actions, sources = self.order_actions(valid_actions, ply, tt_move)
+
+        alpha_orig, beta_orig = alpha, beta
         best_action = None
 
         if maximizing_player:
-            max_eval = -math.inf
-            for action in valid_actions:
-                # Simulate the action
-                new_game = self.simulate_action(game, action)
-                _, eval = self.alpha_beta(new_game, depth - 1, alpha, beta, False, self.get_valid_actions(new_game))
+            best_eval = -math.inf
+            for action, source in zip(valid_actions, sources):
+                # Make the move in place and take it back afterwards
+                record = game.apply_action(game.current_player, action)
+                if record is None:
+                    continue
+                game.current_player.updateScore()
+                _, eval = self.alpha_beta(game, depth - 1, alpha, beta, False, self.get_valid_actions(game))
+                game.undo_action(record)
+                if self.stopped:
+                    return None, 0
 
                 # Update max evaluation and best action
-                if eval > max_eval:
-                    max_eval = eval
+                if eval > best_eval:
+                    best_eval = eval
                     best_action = action
 
                 # Update alpha
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.record_cutoff(action, source, ply, depth)
                     break  # Beta cut-off
-
-            return best_action, max_eval
         else:
-            min_eval = math.inf
-            for action in valid_actions:
-                # Simulate the action
-                new_game = self.simulate_action(game, action)
-                _, eval = self.alpha_beta(new_game, depth - 1, alpha, beta, True, self.get_valid_actions(new_game))
+            best_eval = math.inf
+            for action, source in zip(valid_actions, sources):
+                # Make the move in place and take it back afterwards
+                record = game.apply_action(game.current_player, action)
+                if record is None:
+                    continue
+                game.current_player.updateScore()
+                _, eval = self.alpha_beta(game, depth - 1, alpha, beta, True, self.get_valid_actions(game))
+                game.undo_action(record)
+                if self.stopped:
+                    return None, 0
 
                 # Update min evaluation and best action
-                if eval < min_eval:
-                    min_eval = eval
+                if eval < best_eval:
+                    best_eval = eval
                     best_action = action
 
                 # Update beta
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.record_cutoff(action, source, ply, depth)
                     break  # Alpha cut-off
 
-            return best_action, min_eval
+        if key is not None and best_action is not None:
+            if best_eval <= alpha_orig:
+                flag = UPPER
+            elif best_eval >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.store(key, depth, best_eval, flag, best_action)
 
-    def evaluate_game_state(self, game):
+        return best_action, best_eval
+
+    def expectimax(self, game, depth, alpha, beta, valid_actions):
         """
-        Evaluate the current game state and return a score.
+        Search the multi-player game with chance nodes for the dice.
+
+        The robot maximizes on its own turns and every other player is
+        assumed to minimize its score. Ending the turn leads to a chance
+        node over Game.rollOutcomes, searched with Star1 pruning.
         """
-        # A simple heuristic based on points and resources
-        return self.points + sum(self.hand.values()) * 0.1
+        self.nodes += 1
+        if self.out_of_budget():
+            self.stopped = True
+        if self.stopped:
+            return None, 0
+
+        if depth == 0:
+            low, high = EVAL_BOUNDS
+            return None, min(max(self.evaluate_game_state(game), low), high)
 
-    def simulate_action(self, game, action):
+        # In setup the turn only ends once the free pieces are placed
+        actions = list(valid_actions)
+        if game.round >= 2 or not actions:
+            actions.append(('end_turn', None))
+
+        maximizing = game.current_player.name == self.name
+        ply = self.depth - depth
+        tt_move = self.pv_move if ply == 0 else None
+
+        key = None
+        if game.zobrist:
+            key = game.hashKey
+            entry = self.table.probe(key)
+            if entry is not None:
+                _, entry_depth, value, flag, move, _ = entry
+                if entry_depth >= depth:
+                    if flag == EXACT:
+                        return move, value
+                    elif flag == LOWER:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if beta <= alpha:
+                        return move, value
+                tt_move = move
+
+        actions, sources = self.order_actions(actions, ply, tt_move)
+        alpha_orig, beta_orig = alpha, beta
+        best_action = None
+        best_eval = -math.inf if maximizing else math.inf
+
+        for action, source in zip(actions, sources):
+            if action[0] == 'end_turn':
+                eval = self.chance_node(game, depth, alpha, beta)
+            else:
+                record = game.apply_action(game.current_player, action)
+                if record is None:
+                    continue
+                game.current_player.updateScore()
+                _, eval = self.expectimax(game, depth - 1, alpha, beta, self.get_valid_actions(game))
+                game.undo_action(record)
+            if self.stopped:
+                return None, 0
+
+            if maximizing:
+                if eval > best_eval:
+                    best_eval = eval
+                    best_action = action
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_eval:
+                    best_eval = eval
+                    best_action = action
+                beta = min(beta, eval)
+
+            if beta <= alpha:
+                self.record_cutoff(action, source, ply, depth)
+                break
+
+        if key is not None and best_action is not None:
+            if best_eval <= alpha_orig:
+                flag = UPPER
+            elif best_eval >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.store(key, depth, best_eval, flag, best_action)
+
+        return best_action, best_eval
+
+    def chance_node(self, game, depth, alpha, beta):
         """
-        Simulate a game state resulting from the given action.
+        Expected value of ending the turn, over the distinct roll outcomes.
+
+        Star1: each outcome is searched with the window that could still
+        move the weighted sum across alpha or beta, assuming the outcomes
+        not searched yet score EVAL_BOUNDS.
         """
-        import copy
-        new_game = copy.deepcopy(game)
+        player = game.current_player
+        if (game.turn + 1) // len(game.players) < 2:
+            # no roll yet in the setup rounds
+            record = game.apply_action(player, ('end_turn', None))
+            game.current_player.updateScore()
+            _, value = self.expectimax(game, depth - 1, alpha, beta, self.get_valid_actions(game))
+            game.undo_action(record)
+            return value
 
-        try:
-            if action[0] == 'settlement':
-                if action[1] in new_game.moves['settlements']:
-                    new_game.buySettlement(self.name, action[1])
-            elif action[0] == 'road':
-                if action[1] in new_game.moves['roads']:
-                    new_game.buyRoad(self.name, action[1])
-            elif action[0] == 'city':
-                if action[1] in new_game.moves['cities']:
-                    new_game.buyCity(self.name, action[1])
-            elif action[0] == 'dev_card' and new_game.moves.get('dev_card', False):
-                new_game.buyDev()
-        except KeyError as e:
-            print(f"Simulation error: {e} - Action {action} might not be valid anymore.")
-        except Exception as e:
-            print(f"Unexpected error during simulation: {e}")
-        return new_game
+        low, high = EVAL_BOUNDS
+        total = 0
+        remaining = 1
+        for roll, p in game.rollOutcomes():
+            remaining -= p
+            child_alpha = (alpha - total - high * remaining) / p
+            child_beta = (beta - total - low * remaining) / p
 
-    def get_valid_actions(self, game):
+            record = game.apply_action(player, ('end_turn', roll))
+            game.current_player.updateScore()
+            _, value = self.expectimax(game, depth - 1, max(low, child_alpha), min(high, child_beta), self.get_valid_actions(game))
+            game.undo_action(record)
+            if self.stopped:
+                return 0
+
+            if value <= child_alpha:
+                return total + p * value + high * remaining  # fail low
+            if value >= child_beta:
+                return total + p * value + low * remaining  # fail high
+            total += p * value
+
+        return total
+
+    def order_actions(self, actions, ply, tt_move=None):
         """
-        Generate valid actions for the current game state.
+        Sort actions for alpha_beta: the transposition table move, then the
+        killer moves of this ply, then by history score and action type.
+        Returns the sorted actions and the ordering source of each one.
         """
-        moves = game.moves
-        actions = []
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        history = self.history
+        first = []
+        rest = []
+        for action in actions:
+            if action == tt_move:
+                first.insert(0, (action, 'tt'))
+            elif action in killers:
+                first.append((action, 'killer'))
+            else:
+                rest.append(action)
+
+        rest.sort(key=lambda a: (history.get(a, 0), ACTION_PRIORITY[a[0]]), reverse=True)
+        ordered = first + [(a, 'history' if history.get(a, 0) else 'type') for a in rest]
+        return [a for a, _ in ordered], [source for _, source in ordered]
+
+    def record_cutoff(self, action, source, ply, depth):
+        """Update killers, history and cut-off counts after a cut-off."""
+        self.cutoffs[source] += 1
+        self.history[action] = self.history.get(action, 0) + depth * depth
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if action not in killers:
+                killers.insert(0, action)
+                del killers[2:]
+
+    def out_of_budget(self):
+        """True once the current search has used up its nodes or time."""
+        if self.depth == 1:
+            return False  # always finish depth 1 so there is a move to play
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            return True
+        # the clock is only read every 64 nodes
+        return self.deadline is not None and self.nodes % 64 == 0 and \
+            time.perf_counter() > self.deadline
 
-        if 'settlements' in moves:
-            actions += [('settlement', (i, q)) for i, row in enumerate(moves['settlements']) for q, valid in enumerate(row) if valid]
-        if 'roads' in moves:
-            actions += [('road', road) for road in moves['roads']]
-        if 'cities' in moves:
-            actions += [('city', (i, q)) for i, row in enumerate(moves['cities']) for q, valid in enumerate(row) if valid]
-        if moves.get('dev_card', False):
-            actions.append(('dev_card', None))
+    def evaluate_game_state(self, game):
+        """
+        Evaluate the current game state for this robot: its weighted score
+        minus the best opponent's (see evaluation.py), using the game's
+        incremental Evaluator when a search has set one up.
+        """
+        evaluator = game.evaluator or Evaluator(game)
+        return evaluator.value(game, self.name)
 
-        return actions
+    def get_valid_actions(self, game):
+        """
+        Generate valid actions for the current game state.
+        """
+        return legalMoves(game)
     # def first_Turn(self, game):
     #     """
     #     Perform the robot's first turn by placing a settlement and a road.
@@ -157,8 +451,4 @@ class Robot(Player):
     #     if road_actions:
     #         road_action = road_actions[0]  # Choose the first valid road action
     #         game.buyRoad(self.name, road_action[1])
-<<<<<<< Updated upstream
-    #         print(f"{self.name} placed a road at {road_action[1]}.")
-=======
     #         print(f"{self.name} placed a road at {road_action[1]}.")
->>>>>>> Stashed changes
@@ -0,0 +1,137 @@
+from movegen import legalMasks
+from actions import ACTIONS, legalBits
+from packed import HAND
+from game import WIN_POINTS
+import random
+import time
+
+
+def randomBit(mask, rng):
+    """Index of a uniformly chosen set bit of mask."""
+    k = rng.randrange(mask.bit_count())
+    while k:
+        mask &= mask - 1
+        k -= 1
+    return (mask & -mask).bit_length() - 1
+
+
+def heuristicMove(game, rng):
+    """
+    A cheap move for the current player straight from the move masks:
+    a city, else a settlement, else a road when no settlement spot is in
+    reach, else a dev card, else a bank trade towards the scarcest
+    resource. Returns (kind, index) with index a vertex or edge number
+    or trade, or ('end_turn', None).
+    """
+    settlements, cities, roads, dev_card = legalMasks(game)
+    if cities:
+        return 'city', randomBit(cities, rng)
+    if settlements:
+        return 'settlement', randomBit(settlements, rng)
+
+    player = game.current_player
+    board = game.board
+    if roads and (game.round < 2 or
+                  not player.reachMask & board.availableVertexMask):
+        return 'road', randomBit(roads, rng)
+    if dev_card:
+        return 'dev_card', None
+    if game.round < 2:
+        return 'end_turn', None
+
+    hand = player.hand
+    take = min(HAND, key=hand.__getitem__)
+    for give in HAND:
+        ratio = game.tradeRatio(player, give)
+        # keep one of the resource after trading
+        if give != take and hand[give] > ratio:
+            return 'trade', (give, take, ratio)
+    return 'end_turn', None
+
+
+def randomMove(game, rng):
+    """A uniformly random legal action, as (kind, spec)."""
+    return ACTIONS[randomBit(legalBits(game), rng)]
+
+
+def rollout(game, policy='heuristic', horizon=1000, rng=random):
+    """
+    Play game on in place until a player reaches WIN_POINTS or horizon
+    actions have been played. Returns the winner's name, or None, and
+    the number of actions played. Pass a clone to keep the original.
+    """
+    board = game.board
+    vertexList = board.vertexList
+    edgeList = board.edgeList
+    heuristic = policy == 'heuristic'
+
+    # a 7 rolled before the rollout started
+    if game.robberPending:
+        game.resolveSeven(rng)
+
+    for step in range(horizon):
+        player = game.current_player
+        if heuristic:
+            kind, spec = heuristicMove(game, rng)
+            if kind in ('settlement', 'city'):
+                spec = vertexList[spec]
+            elif kind == 'road':
+                spec = edgeList[spec]
+        else:
+            kind, spec = randomMove(game, rng)
+
+        if kind == 'end_turn':
+            # roll with rng so seeded rollouts repeat
+            game.endTurn(rng.randint(1, 6) + rng.randint(1, 6))
+            if game.robberPending:
+                game.resolveSeven(rng)
+            continue
+        elif kind == 'settlement':
+            game.buySettlement(player.name, spec)
+        elif kind == 'city':
+            game.buyCity(player.name, spec)
+        elif kind == 'road':
+            game.buyRoad(player.name, spec)
+        elif kind == 'dev_card':
+            game.buyDev()
+        else:
+            game.apply_action(player, ('trade', spec))
+            continue
+
+        player.updateScore()
+        if player.points >= WIN_POINTS:
+            return player.name, step + 1
+
+    return None, horizon
+
+
+class RolloutEngine:
+    """
+    Repeated rollouts from one position, each on a fresh clone, with
+    throughput statistics.
+    """
+
+    def __init__(self, policy='heuristic', horizon=1000, seed=None):
+        self.policy = policy
+        self.horizon = horizon
+        self.rng = random.Random(seed)
+
+    def run(self, game, rollouts):
+        """
+        Play rollouts from game and return the win counts per player and
+        the rollouts/sec and steps/sec achieved.
+        """
+        wins = {player.name: 0 for player in game.players}
+        steps = 0
+        start = time.perf_counter()
+        for n in range(rollouts):
+            winner, played = rollout(game.clone(), self.policy,
+                                     self.horizon, self.rng)
+            steps += played
+            if winner is not None:
+                wins[winner] += 1
+
+        elapsed = time.perf_counter() - start
+        return {'wins': wins, 'rollouts': rollouts, 'seconds': elapsed,
+                'rollouts_per_sec': rollouts / elapsed,
+                'steps_per_sec': steps / elapsed}
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import handler
+from actions import ACTIONS, encode as encodeAction
+from test_game import playedGame
+
+
+@pytest.mark.parametrize('seed, steps', [(0, 0), (1, 3), (2, 80), (3, 160),
+                                         (4, 240)])
+def test_materialize_matches_full_successors(seed, steps):
+    game = playedGame(seed, steps)
+    for resource in game.current_player.hand:
+        game.current_player.hand[resource] += 3
+    state = handler.getState(game)
+    new_states, actions = handler.processActions(game, state)
+    batch = new_states.materialize()
+
+    assert batch.shape == (len(actions),) + state.shape
+    for k, action in enumerate(actions):
+        assert (batch[k] == new_states[k]).all()
+
+        # every cell a candidate changes is as the played successor has it
+        successor = game.clone()
+        successor.apply_action(successor.current_player,
+                               ACTIONS[encodeAction(action)])
+        full = handler.getState(successor)
+        changed = batch[k] != state
+        assert (batch[k][changed] == full[changed]).all()
+        if action[0] == 'T':
+            # trades change nothing but the hand planes
+            assert (batch[k] == full).all()
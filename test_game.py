@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+import handler
+from actions import ACTIONS, legalBits
+from evaluation import Evaluator
+from game import Game
+from movegen import bits
+from robber import robberMoves
+from zobrist import Zobrist
+
+
+def playedGame(seed, steps):
+    """A three bot game after up to steps greedy self-play actions."""
+    random.seed(seed)
+    game = Game(player_names=['bot0', 'bot1', 'bot2'],
+                colors=['red', 'blue', 'white'])
+    for step in range(steps):
+        if game.robberPending:
+            game.resolveSeven()
+        state = handler.getState(game)
+        new_states, actions = handler.processActions(game, state)
+        if handler.selectAction(game, new_states, actions,
+                                handler.greedyPolicy):
+            break
+    return game
+
+
+@pytest.mark.parametrize('seed, steps', [(0, 0), (1, 40), (2, 120),
+                                         (3, 200)])
+def test_roll_outcomes_keep_seven_apart(seed, steps):
+    outcomes = playedGame(seed, steps).rollOutcomes()
+    sevens = [p for roll, p in outcomes if roll == 7]
+    assert sevens == [pytest.approx(1 / 6)]
+    assert sum(p for roll, p in outcomes) == pytest.approx(1)
+
+
+def snapshot(game):
+    """Everything apply_action may change, in comparable form."""
+    board = game.board
+    name = lambda owner: owner.name if owner else None
+    return {
+        'scalars': (game.turn, game.round, game.current_player.name,
+                    game.dieRoll, game.rolled, game.playedDev,
+                    game.building_roads, tuple(game.lastHouse),
+                    game.robberPending, name(game.longest_holder or None),
+                    game.devcards.drawn),
+        'vertices': [(name(board.vertices[i][q].owner),
+                      board.vertices[i][q].val,
+                      board.availableVertices[i][q])
+                     for i, q in board.vertexList],
+        'edges': [name(board.edges[edge].owner) for edge in board.edgeList],
+        'available': (board.availableVertexMask, board.availableEdgeMask,
+                      sorted(board.availableEdges)),
+        'robber': (game.robber, [tile.blocked
+                                 for tile in board.spots.values()]),
+        # pieces in any order, unpack lists them in board order
+        'players': [(dict(p.hand), sorted(p.settlements), sorted(p.cities),
+                     sorted(p.roads), p.settlementMask, p.cityMask,
+                     p.roadMask, p.reachMask, p.points, p.longest_road,
+                     dict(p.ports), p.knight, p.year_of_plenty,
+                     p.monopoly, p.road_builder, p.point_cards)
+                    for p in game.players],
+        'longest': [game.longestRoad.length(p) for p in game.players],
+        'hashKey': game.hashKey,
+        'evaluator': game.evaluator and
+                     [list(row) for row in game.evaluator.production],
+    }
+
+
+def randomAction(game, rng):
+    """A legal action, now and then a robber move or a forced 7."""
+    if game.round >= 2 and rng.random() < 0.1:
+        score, spot, victim = rng.choice(robberMoves(game))
+        return ('robber', (spot, victim))
+    if game.round >= 2 and rng.random() < 0.1:
+        return ('end_turn', 7)
+    return ACTIONS[rng.choice(list(bits(legalBits(game))))]
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_apply_undo_round_trip(seed):
+    rng = random.Random(seed)
+    game = playedGame(seed, rng.randint(0, 150))
+    game.zobrist = Zobrist.forPlayers(len(game.players))
+    game.hashKey = game.zobrist.hash(game)
+    game.evaluator = Evaluator(game)
+
+    for trial in range(20):
+        snapshots, records = [], []
+        for depth in range(rng.randint(1, 12)):
+            snapshots.append(snapshot(game))
+            record = game.apply_action(game.current_player,
+                                       randomAction(game, rng))
+            assert record is not None
+            records.append(record)
+            assert game.hashKey == game.zobrist.hash(game)
+
+        while records:
+            game.undo_action(records.pop())
+            assert snapshot(game) == snapshots.pop()
+
+        # move on so the trials start from different positions
+        game.apply_action(game.current_player, randomAction(game, rng))
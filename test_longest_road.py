@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from board import Board
+from longest_road import LongestRoad, bruteForceLongest
+
+
+def build(roads, player='a'):
+    """A standard board and engine with roads added for player in order."""
+    board = Board()
+    engine = LongestRoad(board)
+    for road in roads:
+        board.availableEdges.remove(road)
+        board.edges[road].owner = player
+        engine.addRoad(player, road)
+    return board, engine
+
+
+def settle(board, engine, vertex, player):
+    board.vertices[vertex[0]][vertex[1]].owner = player
+    engine.addSettlement(vertex)
+
+
+STRAIGHT = [((2, 0), (2, 1)), ((2, 1), (2, 2)), ((2, 2), (2, 3)),
+            ((2, 3), (2, 4))]
+# two branches off (2, 2): back along row 2 and down to row 3
+FORK = [((2, 0), (2, 1)), ((2, 1), (2, 2)), ((2, 2), (2, 3)),
+        ((2, 2), (3, 2)), ((3, 2), (3, 3))]
+# the hexagon around the tile on rows 2-3, q 0-2, with a tail
+CYCLE = [((2, 0), (2, 1)), ((2, 1), (2, 2)), ((3, 0), (3, 1)),
+         ((3, 1), (3, 2)), ((2, 0), (3, 0)), ((2, 2), (3, 2)),
+         ((2, 2), (2, 3))]
+
+
+@pytest.mark.parametrize('roads, expected', [
+    (STRAIGHT, 4),
+    (FORK, 4),
+    (CYCLE, 7),
+])
+def test_hand_built(roads, expected):
+    board, engine = build(roads)
+    assert engine.length('a') == expected
+    assert bruteForceLongest(roads) == expected
+
+
+def test_opponent_settlement_cuts_trail():
+    board, engine = build(STRAIGHT)
+    settle(board, engine, (2, 2), 'b')
+    assert engine.length('a') == 2
+    assert bruteForceLongest(STRAIGHT, [(2, 2)]) == 2
+
+
+def test_own_settlement_does_not_cut_trail():
+    board, engine = build(STRAIGHT)
+    settle(board, engine, (2, 2), 'a')
+    assert engine.length('a') == 4
+
+
+@pytest.mark.parametrize('roads', [FORK, CYCLE])
+def test_independent_of_road_order(roads):
+    # a search sharing one visited set across branches gave different
+    # lengths depending on the order the roads were listed in
+    expected = bruteForceLongest(roads)
+    rng = random.Random(0)
+    for trial in range(50):
+        roads = list(roads)
+        rng.shuffle(roads)
+        board, engine = build(roads)
+        assert engine.length('a') == expected
+
+
+def test_undo_restores_length():
+    board, engine = build(FORK[:-1])
+    before = engine.length('a')
+    engine.addRoad('a', FORK[-1])
+    engine.undoRoad(engine.last)
+    assert engine.length('a') == before
+
+
+@pytest.mark.parametrize('trial', range(300))
+def test_matches_brute_force(trial):
+    rng = random.Random(trial)
+    board = Board()
+    players = ['a', 'b']
+    engine = LongestRoad(board)
+    owned = {player: [] for player in players}
+
+    for step in range(rng.randint(1, 24)):
+        player = rng.choice(players)
+        if rng.random() < 0.8:
+            # mostly extend existing roads so components grow long
+            near = [e for r in owned[player] for e in board.edgeEdges[r]
+                    if e in board.availableEdges]
+            road = rng.choice(near or sorted(board.availableEdges))
+            board.availableEdges.remove(road)
+            board.edges[road].owner = player
+            owned[player].append(road)
+            engine.addRoad(player, road)
+        else:
+            i, q = rng.choice(list(board.vertexEdges))
+            if board.vertices[i][q].owner:
+                continue
+            settle(board, engine, (i, q), player)
+
+        for p in players:
+            blocked = [(i, q) for i in range(6) for q in range(11)
+                       if board.vertices[i][q] and
+                       board.vertices[i][q].owner not in (None, p)]
+            assert engine.length(p) == bruteForceLongest(owned[p], blocked)
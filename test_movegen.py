@@ -0,0 +1,30 @@
+import pytest
+
+from movegen import legalMoves
+from test_game import playedGame
+
+
+def gridMoves(game):
+    """The current player's moves read off the grids of availableMoves."""
+    game.availableMoves()
+    moves = game.moves
+    actions = [('settlement', (i, q))
+               for i, row in enumerate(moves['settlements'])
+               for q, valid in enumerate(row) if valid]
+    actions += [('road', road) for road in moves['roads']]
+    actions += [('city', (i, q))
+                for i, row in enumerate(moves.get('cities', []))
+                for q, valid in enumerate(row) if valid]
+    if moves.get('dev_card'):
+        actions.append(('dev_card', None))
+    return actions
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_legal_moves_match_available_moves(seed):
+    for steps in range(0, 240, 12):
+        game = playedGame(seed, steps)
+        # rich hands so every kind of move comes up
+        for resource in game.current_player.hand:
+            game.current_player.hand[resource] += seed % 3
+        assert sorted(legalMoves(game)) == sorted(gridMoves(game))
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from evaluation import Evaluator
+from packed import pack, unpack
+from test_game import playedGame, randomAction, snapshot
+from zobrist import Zobrist
+
+
+@pytest.mark.parametrize('seed, steps', [(0, 0), (1, 5), (2, 60), (3, 150),
+                                         (4, 250)])
+def test_unpack_restores_game(seed, steps):
+    game = playedGame(seed, steps)
+    game.zobrist = Zobrist.forPlayers(len(game.players))
+    game.hashKey = game.zobrist.hash(game)
+    game.evaluator = Evaluator(game)
+    before = snapshot(game)
+    state = pack(game)
+
+    rng = random.Random(seed)
+    for step in range(30):
+        game.apply_action(game.current_player, randomAction(game, rng))
+    unpack(state, game)
+    assert snapshot(game) == before
+
+
+@pytest.mark.parametrize('seed, steps', [(5, 0), (6, 90), (7, 200)])
+def test_to_game_matches_original(seed, steps):
+    game = playedGame(seed, steps)
+    copy = pack(game).toGame()
+    assert snapshot(copy) == snapshot(game)
+    assert copy.board.rollDic == game.board.rollDic
+    assert copy.devcards.cards == game.devcards.cards
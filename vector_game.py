@@ -0,0 +1,115 @@
+from game import Game, WIN_POINTS
+from actions import ACTIONS, N_ACTIONS, legalBits, bitsToMask
+from encoder import encodeBatch, SHAPE
+import numpy as np
+import random
+
+COLORS = ['red', 'blue', 'white', 'orange']
+
+
+class VectorGame:
+    """
+    Thin batching wrapper giving B independent games one array interface.
+
+    Each game is a Game stepped on its own in Python, so the rules are
+    exactly Game's: buySettlement, buyCity, buyRoad, buyDev, and endTurn
+    with its dice roll and playerUpdate. After a 7 large hands are halved
+    and the roller places the robber on the tile robber.py scores best.
+    Only the outputs are batched: arrays that step keeps current, filled
+    by encodeBatch and bitsToMask, holding the observations
+    (B, PLANES, 11, 21) from the current player's view, the legal action
+    mask (B, N_ACTIONS), points (B, n_players) and the current seat (B,).
+    A game is done when a player reaches WIN_POINTS and, with auto_reset,
+    is replaced by a new one.
+    """
+
+    def __init__(self, batch_size, n_players=3, auto_reset=True):
+        self.batch_size = batch_size
+        self.n_players = n_players
+        self.auto_reset = auto_reset
+        self.names = ['bot%d' % seat for seat in range(n_players)]
+        self.games = [None] * batch_size
+
+        self.observations = np.zeros((batch_size,) + SHAPE, np.uint8)
+        self.mask = np.zeros((batch_size, N_ACTIONS), bool)
+        self.points = np.zeros((batch_size, n_players), np.int16)
+        self.seats = np.zeros(batch_size, np.int8)
+        self.steps = np.zeros(batch_size, np.int64)
+
+    def newGame(self):
+        return Game(player_names=list(self.names),
+                    colors=COLORS[:self.n_players])
+
+    def reset(self, seed=None):
+        """Start B new games and return their observations."""
+        if seed is not None:
+            random.seed(seed)
+        self.games = [self.newGame() for b in range(self.batch_size)]
+        self.steps[:] = 0
+        self.refresh()
+        return self.observations
+
+    def legal_action_mask(self):
+        """(B, N_ACTIONS) bool array of the actions step accepts."""
+        return self.mask
+
+    def step(self, actions):
+        """
+        Play one actions.py action id in every game.
+
+        Returns the observations, (B, n_players) rewards, 1 for the seat
+        that won with this step and 0 otherwise, and the (B,) done flags.
+        Games that are done are already reset when auto_reset is on.
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.batch_size,):
+            raise ValueError('expected %d actions, got shape %s'
+                             % (self.batch_size, actions.shape))
+        if not self.mask[np.arange(self.batch_size), actions].all():
+            bad = np.nonzero(~self.mask[np.arange(self.batch_size),
+                                        actions])[0]
+            raise ValueError('illegal actions in games %s' % bad.tolist())
+
+        rewards = np.zeros((self.batch_size, self.n_players), np.float32)
+        dones = np.zeros(self.batch_size, bool)
+
+        for b, action in enumerate(actions.tolist()):
+            game = self.games[b]
+            player = game.current_player
+            kind, spec = ACTIONS[action]
+
+            if kind == 'end_turn':
+                game.endTurn()
+                if game.robberPending:
+                    game.resolveSeven()
+            elif kind == 'settlement':
+                game.buySettlement(player.name, spec)
+            elif kind == 'city':
+                game.buyCity(player.name, spec)
+            elif kind == 'road':
+                game.buyRoad(player.name, spec)
+            elif kind == 'dev_card':
+                game.buyDev()
+            else:
+                game.apply_action(player, ('trade', spec))
+            player.updateScore()
+            self.steps[b] += 1
+
+            if player.points >= WIN_POINTS:
+                rewards[b, self.names.index(player.name)] = 1
+                dones[b] = True
+                if self.auto_reset:
+                    self.games[b] = self.newGame()
+                    self.steps[b] = 0
+
+        self.refresh()
+        return self.observations, rewards, dones
+
+    def refresh(self):
+        """Recompute the array state from the games."""
+        for b, game in enumerate(self.games):
+            self.seats[b] = self.names.index(game.current_player.name)
+            self.points[b] = [player.points for player in game.players]
+
+        bitsToMask([legalBits(game) for game in self.games], self.mask)
+        encodeBatch(self.games, self.observations)
@@ -6,6 +6,7 @@ import board
 import player
 import random
 from robot import Robot
+from opening import openingMove
 from seven import Seven
 
 
@@ -172,7 +173,7 @@ class Visualize:
             tmp = c.create_oval(shiftx+15,shifty+15,
                               shiftx-15,shifty-15,fill = '',outline='')
 
-            tile_to_knight[t] = [tmp,self.game.board.spots[q]]
+            tile_to_knight[t] = [tmp,self.game.board.spots[q],q]
 
             if spot == 'Desert':
                 self.current_robber = t
@@ -212,15 +213,29 @@ class Visualize:
                 c.itemconfigure(tile_to_knight[tag][0],fill='black')
                 c.itemconfigure(tile_to_knight[self.current_robber][0],
                                 fill = '')
-                tile_to_knight[self.current_robber][1].blocked=False
                 self.current_robber = tag
-                tile_to_knight[self.current_robber][1].blocked=True
+                self.game.moveRobber(tile_to_knight[self.current_robber][2])
+                self.game.robberPending = False
 
                 self.robber_move = False
                 self.freeze = False
 
                 self.takeCard(tile_to_knight[self.current_robber][1])
 
+        def moveBotRobber():
+            """Place the robber for a bot that rolled a 7."""
+            # the Seven dialog takes care of the discards
+            spot, victim = self.game.resolveSeven(discard=False)
+            tag = next(t for t, knight in tile_to_knight.items()
+                       if knight[2] == spot)
+            c.itemconfigure(tile_to_knight[self.current_robber][0],
+                            fill = '')
+            c.itemconfigure(tile_to_knight[tag][0],fill='black')
+            self.current_robber = tag
+
+            self.robber_move = False
+            self.freeze = False
+
 
 
         threeOnes = [[-2.8,-2.8*math.sqrt(3)],[-2.8,2.8*math.sqrt(3)],
@@ -424,6 +439,9 @@ class Visualize:
                 self.rolled = True
                 # If the current player is a bot, trigger its action
                 if isinstance(self.game.current_player, Robot):
+                    if self.game.robberPending:
+                        Seven.rolled(self, self.game.players)
+                        moveBotRobber()
                     self.handleBotAction()
                 else:
                     self.rolled = True
@@ -435,11 +453,10 @@ class Visualize:
                     self.updateHand()
                     self.handleBotAction()
 
-                if self.game.dieRoll == 7:
+                if self.game.robberPending:
                     Seven.rolled(self, self.game.players)
 
                 self.updateHand()
-<<<<<<< Updated upstream
                 self.game.availableMoves()
 
         # def handleFirstRoundSetup():
@@ -451,15 +468,6 @@ class Visualize:
         #         actions = self.game.current_player.get_valid_actions(self.game)
         #         settlement_action = next((a for a in actions if a[0] == 'settlement'), None)
         #         road_action = next((a for a in actions if a[0] == 'road'), None)
-=======
-                self.handleBotAction()
-
-                if self.game.dieRoll == 7:
-                    Seven.rolled(self, self.game.players)
-
-                self.updateHand()
-                self.game.availableMoves()
->>>>>>> Stashed changes
 
         #         # Simulate settlement placement
         #         if settlement_action:
@@ -831,19 +839,14 @@ class Visualize:
         """Trigger a bot's action and visually simulate it."""
         if isinstance(self.game.current_player, Robot) and not self.freeze:
 
-<<<<<<< Updated upstream
-            if self.game.round == 1:
-                actions = self.game.current_player.get_available_actions(self.game)
-                settlement_actions = [action for action in actions if action[0] == 'settlement']
-=======
             if self.game.round < 2:
                 actions = self.game.current_player.get_valid_actions(self.game)
                 settlement_actions = [action for action in actions if action[0] == 'settlement']
                 road_actions = [action for action in actions if action[0] == 'road']
->>>>>>> Stashed changes
 
+                opening = openingMove(self.game)
                 if settlement_actions:
-                    action = settlement_actions[0]  # Choose the first available settlement action
+                    action = opening if opening in settlement_actions else settlement_actions[0]
                     print(f"Bot First Round Settlement Action: {action}")
 
                     # Simulate settlement placement
@@ -853,24 +856,21 @@ class Visualize:
                     y = sum(coords[1::2]) / (len(coords) // 2)
                     print(f"Simulating settlement click at: ({x}, {y})")
                     self.c.event_generate('<Button-1>', x=int(x), y=int(y))
-<<<<<<< Updated upstream
-=======
-                
-                if road_actions:
-                    action = settlement_actions[0]  # Choose the first available settlement action
-                    print(f"Bot First Round Settlement Action: {action}")
+
+                    # Update the game state to reflect the bot's action
+                    self.game.buySettlement(self.game.current_player.name, action[1])
+                    self.updateHand()
+                    self.updateDevs()
+
+                elif road_actions:
+                    action = opening if opening in road_actions else road_actions[0]
+                    print(f"Bot First Round Road Action: {action}")
                     tag = next(k for k, v in self.roads_to_edges.items() if v == action[1])
                     coords = self.c.coords(tag)
                     x = sum(coords[::2]) / (len(coords) // 2)
                     y = sum(coords[1::2]) / (len(coords) // 2)
                     print(f"Simulating road click at: ({x}, {y})")
                     self.c.event_generate('<Button-1>', x=int(x), y=int(y))
->>>>>>> Stashed changes
-
-                    # Update the game state to reflect the bot's action
-                    self.game.buySettlement(self.game.current_player.name, action[1])
-                    self.updateHand()
-                    self.updateDevs()
                 else:
                     print("No valid settlement actions available for bot.")
                 
@@ -911,12 +911,6 @@ class Visualize:
                         print("Invalid action.")
                 except Exception as e:
                     print(f"Error in handleBotAction: {e}")
-<<<<<<< Updated upstream
-
-                self.updateHand()
-                self.updateDevs()
-=======
->>>>>>> Stashed changes
 
                 self.updateHand()
                 self.updateDevs()
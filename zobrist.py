@@ -0,0 +1,153 @@
+import random
+
+from packed import HAND
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class Zobrist:
+    """
+    Zobrist keys for a game with a given number of players.
+
+    Covers vertex ownership and level, edge ownership, hands, dev card
+    counts, the robber tile and the player to move. hash computes a key
+    from scratch; update folds in what an apply_action record changed so
+    Game can keep its key current while searching.
+    """
+
+    _cache = {}
+
+    def __init__(self, n_players, seed=0):
+        rng = random.Random(seed)
+        key = lambda: rng.getrandbits(64)
+        self.rng = rng
+        self.vertexKeys = [[[key() for level in range(3)]
+                            for seat in range(n_players)]
+                           for n in range(54)]
+        self.edgeKeys = [[key() for seat in range(n_players)]
+                         for n in range(72)]
+        self.handKeys = [[[] for r in HAND] for seat in range(n_players)]
+        self.devKeys = [[[] for d in range(6)] for seat in range(n_players)]
+        self.robberKeys = {spot: key() for spot in range(1, 20)}
+        self.playerKeys = [key() for seat in range(n_players)]
+        self.sideKey = key()  # minimizing node in Robot.alpha_beta
+
+    @classmethod
+    def forPlayers(cls, n_players):
+        """Shared key set for n_players, built on first use."""
+        if n_players not in cls._cache:
+            cls._cache[n_players] = cls(n_players)
+        return cls._cache[n_players]
+
+    def countKey(self, keys, count):
+        # counts have no fixed cap, so keys are drawn as they are needed
+        while len(keys) <= count:
+            keys.append(self.rng.getrandbits(64))
+        return keys[count]
+
+    def handKey(self, seat, hand):
+        key = 0
+        for r, n in enumerate(hand):
+            key ^= self.countKey(self.handKeys[seat][r], n)
+        return key
+
+    def devKey(self, seat, counts):
+        key = 0
+        for d, n in enumerate(counts):
+            key ^= self.countKey(self.devKeys[seat][d], n)
+        return key
+
+    def devCounts(self, player):
+        return (player.knight, player.year_of_plenty, player.monopoly,
+                player.road_builder, player.point_cards,
+                player.played_knights)
+
+    def hash(self, game):
+        """Key of the full game state."""
+        board = game.board
+        seats = {player: seat for seat, player in enumerate(game.players)}
+        key = self.robberKeys[game.robber] ^ \
+            self.playerKeys[seats[game.current_player]]
+
+        for n, (i, q) in enumerate(board.vertexList):
+            vertex = board.vertices[i][q]
+            if vertex.owner:
+                key ^= self.vertexKeys[n][seats[vertex.owner]][vertex.val]
+
+        for n, edge in enumerate(board.edgeList):
+            owner = board.edges[edge].owner
+            if owner:
+                key ^= self.edgeKeys[n][seats[owner]]
+
+        for seat, player in enumerate(game.players):
+            key ^= self.handKey(seat, [player.hand[r] for r in HAND])
+            key ^= self.devKey(seat, self.devCounts(player))
+
+        return key
+
+    def update(self, game, record, key):
+        """
+        Key after the action of an apply_action record, given the key
+        from before it.
+        """
+        action, player, scalars, hands, scores, extra = record
+        board = game.board
+        players = game.players
+        seat = players.index(player)
+
+        if action[0] == 'settlement':
+            n = board.vertexIndex[tuple(action[1])]
+            key ^= self.vertexKeys[n][seat][1]
+        elif action[0] == 'city':
+            n = board.vertexIndex[tuple(action[1])]
+            key ^= self.vertexKeys[n][seat][1] ^ self.vertexKeys[n][seat][2]
+        elif action[0] == 'road':
+            key ^= self.edgeKeys[board.edgeIndex[action[1]]][seat]
+        elif action[0] == 'dev_card':
+            new = self.devCounts(player)
+            key ^= self.devKey(seat, extra + new[5:]) ^ \
+                self.devKey(seat, new)
+        elif action[0] == 'end_turn':
+            key ^= self.playerKeys[players.index(scalars[2])] ^ \
+                self.playerKeys[players.index(game.current_player)]
+        if action[0] in ('robber', 'end_turn') and extra:
+            key ^= self.robberKeys[extra[0]] ^ self.robberKeys[game.robber]
+
+        # hands: dice rolls on end_turn can change everybody's
+        for s, (p, old) in enumerate(zip(players, hands)):
+            new = tuple(p.hand.values())
+            if new != old:
+                key ^= self.handKey(s, old) ^ self.handKey(s, new)
+
+        return key
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table for Robot.alpha_beta.
+
+    Entries are (key, depth, value, flag, move, generation), one slot per
+    key modulo size. A slot is only overwritten by a search at least as
+    deep, or when it was written during an earlier search.
+    """
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+
+    def newSearch(self):
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        index = key % self.size
+        old = self.slots[index]
+        if old is None or depth >= old[1] or old[5] != self.generation:
+            self.slots[index] = (key, depth, value, flag, move,
+                                 self.generation)